@@ -0,0 +1,128 @@
+"""
+noisefield.py
+
+Generate large 3D noise volumes from pnoise.py, split
+across multiple processes.
+
+The grid is split into chunks of samples, and each worker
+process writes its chunk straight into one shared memory
+output buffer, so no results are pickled back to the caller.
+The result is identical to evaluating the whole grid serially.
+
+Requires python 3.8+ (multiprocessing.shared_memory) and numpy.
+
+When running inside of Maya, multiprocessing must be told to
+start mayapy for its workers, instead of the Maya executable:
+
+    import multiprocessing
+    multiprocessing.set_executable("/path/to/mayapy")
+
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+from pnoise import get_generator, PERLIN
+
+
+def noise_grid(xs, ys, zs, seed=None, basis=PERLIN, workers=None, chunk_size=None,
+               executor=None):
+    """
+    noise_grid (array xs, array ys, array zs, int seed=None, string basis=PERLIN,
+                int workers=None, int chunk_size=None, Executor executor=None)
+        -> numpy.ndarray
+
+        Evaluate 3D noise for every point of the grid made from the
+        xs, ys and zs coordinates, and return it as an array with the
+        shape (len(xs), len(ys), len(zs)).
+
+        array xs, ys, zs    - 1D arrays of the coordinates along each axis
+        int seed            - seed of the pnoise generator to use
+        string basis        - pnoise.PERLIN or pnoise.SIMPLEX
+        int workers         - number of processes. Defaults to the number of cpus.
+                              1 evaluates serially in this process, unless an
+                              executor is given.
+        int chunk_size      - number of samples per task. By default the grid
+                              is split into 4 tasks per worker.
+        Executor executor   - an existing ProcessPoolExecutor to reuse, instead
+                              of starting a new one for this call
+    """
+    xs = numpy.ascontiguousarray(xs, dtype=numpy.float64).ravel()
+    ys = numpy.ascontiguousarray(ys, dtype=numpy.float64).ravel()
+    zs = numpy.ascontiguousarray(zs, dtype=numpy.float64).ravel()
+
+    shape = (len(xs), len(ys), len(zs))
+    size = len(xs) * len(ys) * len(zs)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if size == 0:
+        return numpy.zeros(shape)
+
+    if workers <= 1 and executor is None:
+        out = numpy.empty(shape)
+        _evaluateChunk(out.reshape(-1), shape, 0, size, xs, ys, zs, seed, basis)
+        return out
+
+    if not chunk_size:
+        chunk_size = -(-size // (workers * 4))
+
+    shm = shared_memory.SharedMemory(create=True, size=size * 8)
+    try:
+        ownExecutor = executor is None
+        if ownExecutor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        try:
+            futures = []
+            for start in range(0, size, chunk_size):
+                stop = min(start + chunk_size, size)
+                futures.append(executor.submit(_sharedChunk, shm.name, shape,
+                                               start, stop, xs, ys, zs, seed, basis))
+
+            # raise any error from the workers
+            for future in futures:
+                future.result()
+
+        finally:
+            if ownExecutor:
+                executor.shutdown()
+
+        shared = numpy.ndarray(shape, dtype=numpy.float64, buffer=shm.buf)
+        out = shared.copy()
+        del shared
+
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return out
+
+
+def _sharedChunk(shmName, shape, start, stop, xs, ys, zs, seed, basis):
+    """
+    Worker process entry point. Evaluates the samples from
+    start to stop into the shared memory output buffer.
+    """
+    shm = shared_memory.SharedMemory(name=shmName)
+    flat = numpy.ndarray((shape[0] * shape[1] * shape[2],),
+                         dtype=numpy.float64, buffer=shm.buf)
+    try:
+        _evaluateChunk(flat, shape, start, stop, xs, ys, zs, seed, basis)
+    finally:
+        # the array has to let go of the buffer before closing it
+        del flat
+        shm.close()
+
+
+def _evaluateChunk(flat, shape, start, stop, xs, ys, zs, seed, basis):
+    """
+    Evaluate the flat grid indices from start to stop into flat
+    """
+    i, j, k = numpy.unravel_index(numpy.arange(start, stop), shape)
+    gen = get_generator(seed, basis)
+    flat[start:stop] = gen.noise_array(xs[i], ys[j], zs[k])
@@ -0,0 +1,127 @@
+/*
+
+noisekernel.c
+
+    A compiled version of the 1D fbm() from pnoise.py, loaded
+    with ctypes by noisekernel.py. Every operation is done in
+    the same order as the python version, so the results are
+    identical. It must be built without fast-math or fused
+    multiply-add contraction, which would change the rounding:
+
+    Linux / OSX:
+        cc -O2 -ffp-contract=off -shared -fPIC noisekernel.c -o _noisekernel.so
+    Windows:
+        cl /O2 /fp:precise /LD noisekernel.c /Fe_noisekernel.dll
+
+    or call noisekernel.build() from python.
+
+    The gradient tables are the 257 entry _grad1 (Perlin) or
+    _sgrad1 (simplex) tables of a pnoise.NoiseGenerator.
+
+*/
+
+#include <math.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT
+#endif
+
+
+static double lerp(double t, double a, double b)
+{
+    return a + t * (b - a);
+}
+
+static double fade(double t)
+{
+    return t * t * t * (t * (t * 6 - 15) + 10);
+}
+
+
+/* pnoise _noise1Kernel(), x is the position in the lattice cell */
+static double noise1Kernel(double x, double g0, double g1, int simplex)
+{
+    if (simplex) {
+        double x1 = x - 1;
+        double t0 = 1 - x * x;
+        double t1;
+        t0 *= t0;
+        t1 = 1 - x1 * x1;
+        t1 *= t1;
+        return 0.395 * (t0 * t0 * g0 * x + t1 * t1 * g1 * x1);
+    }
+
+    return lerp(fade(x), g0 * x, g1 * (x - 1));
+}
+
+
+/* pnoise NoiseGenerator.perlin1() and simplex1() */
+static double noise1(const double *table, int simplex, double x)
+{
+    double fx = floor(x);
+    int X = (int)((long long)fx & 255);
+
+    return noise1Kernel(x - fx, table[X], table[X + 1], simplex);
+}
+
+
+/* pnoise NoiseGenerator.fbm() of a single time value */
+EXPORT double noisekernel_fbm1(const double *table, int simplex, double t,
+                               double freq, double amp, int octaves,
+                               double lacunarity, double gain, double tolerance)
+{
+    double val = 0;
+    int i;
+
+    for (i = 0; i < octaves; i++) {
+        if (fabs(amp) >= tolerance)
+            val += noise1(table, simplex, t * freq) * amp;
+        freq *= lacunarity;
+        amp *= gain;
+    }
+    return val;
+}
+
+
+/* noisekernel_fbm1() of count time values, into out */
+EXPORT void noisekernel_fbm1_array(const double *table, int simplex,
+                                   const double *t, double *out, long count,
+                                   double freq, double amp, int octaves,
+                                   double lacunarity, double gain, double tolerance)
+{
+    long i;
+
+    for (i = 0; i < count; i++)
+        out[i] = noisekernel_fbm1(table, simplex, t[i], freq, amp, octaves,
+                                  lacunarity, gain, tolerance);
+}
+
+
+/*
+    noisekernel_fbm1() of the three axes of a shakeNode at one
+    time, into out, in one call. Each axis has its own table,
+    frequency and amplitude. An axis with a frequency or an
+    amplitude of 0 is 0, and its table is not used.
+
+    The float settings are packed into one array, which is
+    much cheaper to pass from ctypes than separate arguments:
+        t, lacunarity, gain, tolerance, freq[3], amp[3]
+*/
+EXPORT void noisekernel_fbm1_3(const double *const *tables, int simplex, int octaves,
+                               const double *settings, double *out)
+{
+    double t = settings[0];
+    const double *freq = settings + 4;
+    const double *amp = settings + 7;
+    int axis;
+
+    for (axis = 0; axis < 3; axis++) {
+        if (freq[axis] == 0 || amp[axis] == 0)
+            out[axis] = 0;
+        else
+            out[axis] = noisekernel_fbm1(tables[axis], simplex, t, freq[axis], amp[axis], octaves,
+                                         settings[1], settings[2], settings[3]);
+    }
+}
@@ -0,0 +1,212 @@
+"""
+noisekernel.py
+
+The 1D fbm() of pnoise.py, from the compiled noisekernel.c
+when it is available, and from pnoise otherwise. Both give
+identical results, so callers do not need to care which one
+is used. BACKEND tells which one it is.
+
+The kernel is loaded from the _noisekernel shared library
+next to this file. Build it once with:
+
+    import noisekernel
+    noisekernel.build()
+
+or see noisekernel.c to build it by hand.
+
+"""
+
+import os
+import sys
+import ctypes
+import subprocess
+
+from pnoise import PERLIN, SIMPLEX, BASES, numpy, _requireNumpy
+
+
+# The names of the two backends
+KERNEL = "kernel"
+PYTHON = "python"
+
+if sys.platform == "win32":
+    _libName = "_noisekernel.dll"
+elif sys.platform == "darwin":
+    _libName = "_noisekernel.dylib"
+else:
+    _libName = "_noisekernel.so"
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+
+LIBRARY_PATH = os.path.join(_dir, _libName)
+SOURCE_PATH  = os.path.join(_dir, "noisekernel.c")
+
+_lib = None
+BACKEND = PYTHON
+
+# The ctypes arrays of fbm3(): the table of each axis,
+# the float settings, and the value of each axis
+_Tables = ctypes.c_void_p * 3
+_Settings = ctypes.c_double * 10
+_Axes = ctypes.c_double * 3
+
+
+def load(path=LIBRARY_PATH):
+    """
+    load (string path=LIBRARY_PATH) -> bool loaded
+
+        Load the compiled kernel, and use it from now on.
+        Returns False, and keeps using pnoise, if it can
+        not be loaded, or was built from an older 
+        noisekernel.c that is missing functions.
+    """
+    global _lib, BACKEND
+
+    try:
+        lib = ctypes.CDLL(path)
+        lib.noisekernel_fbm1, lib.noisekernel_fbm1_3, lib.noisekernel_fbm1_array
+    except (OSError, AttributeError):
+        return False
+
+    lib.noisekernel_fbm1.restype = ctypes.c_double
+    lib.noisekernel_fbm1.argtypes = [
+        ctypes.c_void_p, ctypes.c_int, ctypes.c_double,
+        ctypes.c_double, ctypes.c_double, ctypes.c_int,
+        ctypes.c_double, ctypes.c_double, ctypes.c_double]
+
+    lib.noisekernel_fbm1_3.restype = None
+    lib.noisekernel_fbm1_3.argtypes = [_Tables, ctypes.c_int, ctypes.c_int, _Settings, _Axes]
+
+    lib.noisekernel_fbm1_array.restype = None
+    lib.noisekernel_fbm1_array.argtypes = [
+        ctypes.c_void_p, ctypes.c_int,
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_long,
+        ctypes.c_double, ctypes.c_double, ctypes.c_int,
+        ctypes.c_double, ctypes.c_double, ctypes.c_double]
+
+    _lib = lib
+    BACKEND = KERNEL
+    return True
+
+
+def unload():
+    """
+    unload()
+
+        Stop using the compiled kernel, and fall back to pnoise
+    """
+    global _lib, BACKEND
+    _lib = None
+    BACKEND = PYTHON
+
+
+def build(compiler="cc", path=LIBRARY_PATH):
+    """
+    build (string compiler="cc", string path=LIBRARY_PATH) -> bool loaded
+
+        Compile noisekernel.c into a shared library with a gcc or
+        clang compatible compiler, and load it. On Windows, build
+        it by hand with cl, as described in noisekernel.c.
+    """
+    cmd = [compiler, "-O2", "-ffp-contract=off", "-shared", "-fPIC",
+           SOURCE_PATH, "-o", path]
+    subprocess.check_call(cmd)
+    return load(path)
+
+
+def fbm(gen, t, freq=1.0, amp=1.0, octaves=3, lacunarity=2.0, gain=0.5, basis=None,
+        tolerance=0):
+    """
+    fbm (NoiseGenerator gen, float t, float freq=1.0, float amp=1.0,
+         int octaves=3, float lacunarity=2.0, float gain=0.5,
+         string basis=None, float tolerance=0) -> float noise
+
+        gen.fbm(t, ...) of a single time value
+    """
+    if basis is None:
+        basis = gen.basis
+
+    if _lib is None:
+        return gen.fbm(t, freq, amp, octaves, 0, lacunarity, gain, basis, tolerance=tolerance)
+
+    return _lib.noisekernel_fbm1(_table(gen, basis), basis == SIMPLEX, t,
+                                 freq, amp, octaves, lacunarity, gain, tolerance)
+
+
+def fbm3(gens, t, freq, amp, octaves=3, lacunarity=2.0, gain=0.5, basis=PERLIN, tolerance=0):
+    """
+    fbm3 (list gens, float t, list freq, list amp, int octaves=3,
+          float lacunarity=2.0, float gain=0.5, string basis=PERLIN,
+          float tolerance=0) -> list noise
+
+        fbm() of the 3 generators in gens at the time t, each with its
+        own frequency and amplitude, like the 3 axes of a shakeNode.
+        An axis with a frequency or amplitude of 0 is 0, and its 
+        generator may be None. The kernel evaluates all of them in
+        a single call.
+    """
+    if basis not in BASES:
+        raise ValueError("Unknown noise basis: %r" % (basis,))
+
+    if _lib is None:
+        return [gen.fbm(t, f, a, octaves, 0, lacunarity, gain, basis, tolerance=tolerance)
+                if f != 0 and a != 0 else 0.0
+                for gen, f, a in zip(gens, freq, amp)]
+
+    # the same tables as _table(), without checking the basis again
+    name = "_sgrad1" if basis == SIMPLEX else "_grad1"
+    tables = _Tables(*[getattr(gen, name).buffer_info()[0] if f != 0 and a != 0 else None 
+                       for gen, f, a in zip(gens, freq, amp)])
+    settings = _Settings(t, lacunarity, gain, tolerance, freq[0], freq[1], freq[2], 
+                         amp[0], amp[1], amp[2])
+    out = _Axes()
+    _lib.noisekernel_fbm1_3(tables, basis == SIMPLEX, octaves, settings, out)
+    return out[:]
+
+
+def fbm_array(gen, t, freq=1.0, amp=1.0, octaves=3, lacunarity=2.0, gain=0.5, basis=None,
+              tolerance=0):
+    """
+    fbm_array (NoiseGenerator gen, array t, ...) -> numpy.ndarray
+
+        gen.fbm(t, ...) of an array of time values, as an array
+        of the same shape. A single time gives a 0-d array. Takes
+        the same arguments as fbm(). Requires numpy.
+    """
+    _requireNumpy()
+
+    if basis is None:
+        basis = gen.basis
+
+    t = numpy.asarray(t, dtype=numpy.float64)
+
+    if _lib is None:
+        return numpy.asarray(gen.fbm(t, freq, amp, octaves, 0, lacunarity, gain, basis, 
+                                     tolerance=tolerance))
+
+    # the kernel works on a flat, contiguous copy when needed
+    flat = numpy.ascontiguousarray(t.ravel())
+    out = numpy.empty_like(flat)
+    _lib.noisekernel_fbm1_array(_table(gen, basis), basis == SIMPLEX,
+                                flat.ctypes.data, out.ctypes.data, flat.size,
+                                freq, amp, octaves, lacunarity, gain, tolerance)
+    return out.reshape(t.shape)
+
+
+def _table(gen, basis):
+    """
+    The address of the 1D gradient table of gen for basis.
+    The generator owns the table, and must be kept alive
+    for as long as the address is used.
+    """
+    if basis not in BASES:
+        raise ValueError("Unknown noise basis: %r" % (basis,))
+
+    if basis == SIMPLEX:
+        table = gen._sgrad1
+    else:
+        table = gen._grad1
+    return table.buffer_info()[0]
+
+
+# use the kernel if it has been built
+load()
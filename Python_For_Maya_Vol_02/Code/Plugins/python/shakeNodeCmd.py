@@ -2,11 +2,32 @@
 shakeNodeCmd.py
 
 Helper command for creating and returning a new
-shakeNode from our plugin.
+shakeNode from our plugin. createShakeNodes() rigs
+many transforms at once. createShakeFollowers() rigs
+many transforms from a single shakeSource.
+
+bakeShakeNodes() converts shakeNodes to animCurves, so
+the shakes can be used without the plugin, through the
+plugin's undoable bakeShakeNodes command. queueShakeBake()
+and setShakeKeys() are the steps of that command.
+
+reportShakeNodes() prints the profiling counters of
+the shakeNodes in the scene.
 
 """
 
 import maya.cmds as cmds
+import maya.OpenMaya as OpenMaya
+import maya.OpenMayaAnim as OpenMayaAnim
+
+from pnoise import get_generator, BASES
+
+# numpy evaluates every frame of a curve at once,
+# when it is available
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
 def createShakeNode(transform=None):
 	"""
@@ -33,3 +54,358 @@ def createShakeNode(transform=None):
 
 	return shake
 
+
+def createShakeNodes(transforms):
+	"""
+	createShakeNodes (list transforms) -> list nodes
+
+		createShakeNode() for many transforms at once. The plugin
+		is checked once, and the createShakeNodes command makes
+		every node and connection with one MDGModifier, which is
+		a single undo step. Returns the new shakeNodes, in the
+		same order as the transforms.
+	"""
+
+	if not cmds.pluginInfo("shakeNode", query=True, loaded=True):
+		cmds.error("shakeNode plugin is not loaded!")
+
+	if not transforms:
+		return []
+
+	return cmds.createShakeNodes(transforms) or []
+
+
+def createShakeFollowers(transforms, spread=1.0):
+	"""
+	createShakeFollowers (list transforms, float spread=1.0) -> (string source, list followers)
+
+		Create one shakeSource, and a shakeFollower for each transform
+		that drives its translate. The followers play the curve of the
+		source spread seconds apart, so each transform gets a different
+		part of the same noise. The noise is only evaluated by the source,
+		so this scales to many more transforms than createShakeNodes().
+
+		This runs the createShakeFollowers command of the plugin, so
+		all the nodes and connections are a single undo step.
+	"""
+
+	if not cmds.pluginInfo("shakeNode", query=True, loaded=True):
+		cmds.error("shakeNode plugin is not loaded!")
+
+	for transform in transforms:
+		if not cmds.objExists(transform):
+			cmds.error("transform does not exist: %s" % transform)
+
+	# the command uses the selection when given no transforms
+	if not transforms:
+		return cmds.createNode("shakeSource"), []
+
+	nodes = cmds.createShakeFollowers(transforms, spread=spread)
+
+	return nodes[0], nodes[1:]
+
+
+def bakeShakeNodes(nodes=None, start=None, end=None):
+	"""
+	bakeShakeNodes (list nodes=None, float start=None, float end=None) -> list curves
+
+		Replace the output connections of shakeNodes with animCurves,
+		keyed on every frame from start to end. By default the selected
+		shakeNodes are baked, or every shakeNode if none are selected,
+		over the playback range.
+
+		The noise is evaluated here in python, with the same settings
+		as each node, instead of stepping the timeline and reading the 
+		output. Settings that are keyed or connected are read at each
+		frame, and the others once. The keys of each curve are then set
+		in one addKeys() call.
+		Unit conversions between the output and its destinations are
+		baked into the keys.
+
+		This runs the bakeShakeNodes command of the plugin, so the 
+		whole bake is a single undo step, and the plugin must be loaded.
+		The shakeNodes are left in the scene, disconnected. Once they
+		are deleted, the plugin is no longer needed.
+	"""
+
+	if not cmds.pluginInfo("shakeNode", query=True, loaded=True):
+		cmds.error("shakeNode plugin is not loaded!")
+
+	if nodes is None:
+		nodes = cmds.ls(selection=True, type="shakeNode") or cmds.ls(type="shakeNode")
+
+	if start is None:
+		start = cmds.playbackOptions(query=True, min=True)
+	if end is None:
+		end = cmds.playbackOptions(query=True, max=True)
+
+	if not nodes:
+		return []
+
+	return cmds.bakeShakeNodes(nodes, start=start, end=end) or []
+
+
+def queueShakeBake(nodes, start, end, modifier):
+	"""
+	queueShakeBake (list nodes, float start, float end, MDGModifier modifier) -> list keys
+
+		Queue the disconnections, the deleted unit conversions and the
+		new animCurves of bakeShakeNodes() on modifier, without doing them.
+		Returns the (MObject curve, MTimeArray times, MDoubleArray values)
+		keys of each curve, to pass to setShakeKeys() after modifier.doIt().
+	"""
+
+	count = int(round(end - start)) + 1
+	frames = [start + i for i in range(count)]
+
+	# The key times are shared by all of the curves
+	unit = OpenMaya.MTime.uiUnit()
+	times = OpenMaya.MTimeArray()
+	for frame in frames:
+		times.append(OpenMaya.MTime(frame, unit))
+
+	secsPerFrame = OpenMaya.MTime(1.0, unit).asUnits(OpenMaya.MTime.kSeconds)
+	secs = [frame * secsPerFrame for frame in frames]
+
+	keys = []
+	for node in nodes:
+
+		targets, connections, conversions = _getShakeTargets(node)
+		if not targets:
+			continue
+
+		axes = sorted(set(target[0] for target in targets))
+
+		# Settings that are keyed or connected can change on every
+		# frame, so they are read and evaluated one frame at a time.
+		# Otherwise they are read once, for every frame at once.
+		if _hasDrivenSettings(node):
+			shakes = dict((axis, []) for axis in axes)
+			for frame, t in zip(frames, secs):
+				settings = _getShakeSettings(node, frame)
+				for axis in axes:
+					shakes[axis].extend(_evaluateShake([t], *_axisSettings(settings, axis)))
+		else:
+			settings = _getShakeSettings(node)
+			shakes = dict((axis, _evaluateShake(secs, *_axisSettings(settings, axis)))
+						  for axis in axes)
+
+		for src, dst in connections:
+			modifier.disconnect(_getPlug(src), _getPlug(dst))
+		for conversion in conversions:
+			modifier.deleteNode(_getNode(conversion))
+
+		for axis, dst, factor in targets:
+			values = OpenMaya.MDoubleArray()
+			for value in shakes[axis]:
+				values.append(value * factor)
+
+			curve = OpenMayaAnim.MFnAnimCurve().create(_getPlug(dst), modifier)
+			keys.append((curve, times, values))
+
+	return keys
+
+
+def setShakeKeys(keys, change=None):
+	"""
+	setShakeKeys (list keys, MAnimCurveChange change=None) -> list curves
+
+		Add the keys from queueShakeBake() to their curves, once they
+		have been created. The key changes are recorded in change, 
+		to undo them. Returns the names of the curves.
+	"""
+	curves = []
+	for curve, times, values in keys:
+		curveFn = OpenMayaAnim.MFnAnimCurve(curve)
+		curveFn.addKeys(times, values, OpenMayaAnim.MFnAnimCurve.kTangentGlobal, 
+						OpenMayaAnim.MFnAnimCurve.kTangentGlobal, False, change)
+		curves.append(curveFn.name())
+	return curves
+
+
+# The settings of a shakeNode that bakeShakeNodes() reads
+_SHAKE_SETTINGS = ("amplitude", "frequency", "randomSeed", "octaves", "noiseType", 
+				   "octaveTolerance", "enable")
+
+
+def _hasDrivenSettings(node):
+	"""
+	True if any of the settings of a shakeNode, or one of the
+	children of a compound setting, has an incoming connection,
+	like an animCurve or an expression
+	"""
+	for attr in _SHAKE_SETTINGS:
+		children = cmds.attributeQuery(attr, node=node, listChildren=True) or []
+		for name in [attr] + children:
+			if cmds.listConnections("%s.%s" % (node, name), source=True, destination=False):
+				return True
+	return False
+
+
+def _getShakeSettings(node, frame=None):
+	"""
+	Returns the (amp, freq, seed, octaves, basis, tolerance, enable)
+	settings of a shakeNode, at frame if it is given, or else
+	at the current time
+	"""
+	kwargs = {} if frame is None else {"time": frame}
+
+	def get(attr):
+		return cmds.getAttr("%s.%s" % (node, attr), **kwargs)
+
+	return (get("amplitude")[0],
+			get("frequency")[0],
+			get("randomSeed"),
+			get("octaves"),
+			BASES[get("noiseType")],
+			get("octaveTolerance"),
+			get("enable")[0])
+
+
+def _axisSettings(settings, axis):
+	"""
+	The _evaluateShake() arguments after secs, for one 
+	axis of the settings from _getShakeSettings(). Each
+	axis has its own seed, like in the node.
+	"""
+	amp, freq, seed, octaves, basis, tol, enable = settings
+	return (freq[axis], amp[axis] if enable[axis] else 0, seed * 3 + axis, 
+			octaves, basis, tol)
+
+
+def _evaluateShake(secs, freq, amp, seed, octaves, basis, tolerance=0):
+	"""
+	The shakeNode output of one axis at each of the secs times
+	"""
+	if amp == 0 or freq == 0:
+		return [0.0] * len(secs)
+
+	gen = get_generator(seed)
+	if numpy is not None:
+		return gen.fbm(numpy.array(secs), freq, amp, octaves, basis=basis, 
+					   tolerance=tolerance).tolist()
+
+	sampler = gen.sampler(freq, amp, octaves, basis=basis, tolerance=tolerance)
+	return [sampler.sample(t) for t in secs]
+
+
+def _getShakeTargets(node):
+	"""
+	Returns the (axis, plug, factor) targets of a shakeNode output,
+	where each plug is a single numeric attribute driven by that axis,
+	scaled by factor. Also returns the (src, dst) connections and
+	unitConversion nodes to remove before keying the targets.
+	"""
+	children = cmds.attributeQuery("output", node=node, listChildren=True)
+
+	targets 	= []
+	connections = []
+	conversions = []
+
+	pairs = cmds.listConnections(node, source=False, destination=True,
+								 plugs=True, connections=True) or []
+
+	for src, dst in zip(pairs[::2], pairs[1::2]):
+		attr = src.split(".", 1)[1]
+		if attr == "output":
+			axes = [0, 1, 2]
+		elif attr in children:
+			axes = [children.index(attr)]
+		else:
+			continue
+
+		dstNode = dst.split(".", 1)[0]
+		factor = 1.0
+		connections.append((src, dst))
+
+		# follow a unitConversion through to the real destinations
+		if cmds.nodeType(dstNode) == "unitConversion":
+			factor = cmds.getAttr("%s.conversionFactor" % dstNode)
+			conversions.append(dstNode)
+			dsts = cmds.listConnections("%s.output" % dstNode, source=False, destination=True, 
+										plugs=True) or []
+		else:
+			dsts = [dst]
+
+		for dst in dsts:
+			if len(axes) == 1:
+				targets.append((axes[0], dst, factor))
+				continue
+
+			# the children of the exact destination plug, keeping
+			# the index of an array element like vec[0]
+			dstNode, dstAttr = dst.split(".", 1)
+			dstChildren = cmds.attributeQuery(dstAttr.split(".")[-1].split("[")[0], node=dstNode, 
+											  listChildren=True) or []
+			for axis, child in zip(axes, dstChildren):
+				targets.append((axis, "%s.%s.%s" % (dstNode, dstAttr, child), factor))
+
+	return targets, connections, conversions
+
+
+def _getNode(name):
+	"""
+	Returns the MObject of a node name
+	"""
+	sel = OpenMaya.MSelectionList()
+	sel.add(name)
+	obj = OpenMaya.MObject()
+	sel.getDependNode(0, obj)
+	return obj
+
+
+def _getPlug(name):
+	"""
+	Returns the MPlug for an attribute name, like "pCube1.translateX"
+	"""
+	sel = OpenMaya.MSelectionList()
+	sel.add(name)
+	plug = OpenMaya.MPlug()
+	sel.getPlug(0, plug)
+	return plug
+
+
+def reportShakeNodes(nodes=None, enable=False):
+	"""
+	reportShakeNodes (list nodes=None, bool enable=False) -> list stats
+
+		Print the profiling counters of shakeNodes, from the most 
+		to the least total compute time, followed by their totals.
+		By default every shakeNode in the scene is reported. 
+
+		Counters are only kept while the profile attribute of a node
+		is on. With enable=True, it is first turned on for every node,
+		to report on the next playback.
+
+		Returns a (node, computeCount, computeTime, averageOctaves)
+		tuple for each node.
+	"""
+
+	if nodes is None:
+		nodes = cmds.ls(type="shakeNode")
+
+	if enable:
+		for node in nodes:
+			cmds.setAttr("%s.profile" % node, True)
+
+	stats = []
+	for node in nodes:
+		stats.append((node,
+					  cmds.getAttr("%s.computeCount" % node),
+					  cmds.getAttr("%s.computeTime" % node),
+					  cmds.getAttr("%s.averageOctaves" % node)))
+
+	stats.sort(key=lambda stat: stat[2], reverse=True)
+
+	totalCount = sum(stat[1] for stat in stats)
+	totalTime = sum(stat[2] for stat in stats)
+
+	print("%-32s %10s %12s %10s %10s" % ("shakeNode", "computes", "seconds", "ms/call", "octaves"))
+	for node, count, seconds, octaves in stats:
+		perCall = seconds / count * 1000.0 if count else 0.0
+		print("%-32s %10d %12.4f %10.4f %10.2f" % (node, count, seconds, perCall, octaves))
+
+	perCall = totalTime / totalCount * 1000.0 if totalCount else 0.0
+	print("%-32s %10d %12.4f %10.4f" % ("total (%d nodes)" % len(stats), totalCount, totalTime, perCall))
+
+	return stats
@@ -34,8 +34,8 @@ shakeNode.py
 A dependency graph node plugin.
 Creates a shake generator using a perlin noise function.
 
-Uses pnoise.py which should be found in the same directory
-as this file. 
+Uses pnoise.py and shakeNodeCmd.py, which should be found on
+the python path. 
 
 This should be placed in your MAYA_PLUG_IN_PATH location, or you
 can load it directly for testing purposes:
@@ -46,16 +46,74 @@ PYTHON usage:
     shake = cmds.createNode("shakeNode")
     cmds.connectAttr("time1.outTime", "%s.time" % shake)
 
+The plugin also provides a shakeArrayNode, which shakes many
+channels from a single node. Each element of its channel
+array has its own amplitude, frequency and seed, and drives
+the output element with the same index:
+
+    shake = cmds.createNode("shakeArrayNode")
+    cmds.connectAttr("time1.outTime", "%s.time" % shake)
+    cmds.setAttr("%s.channel[0].randomSeed" % shake, 42)
+    cmds.connectAttr("%s.output[0]" % shake, "pCube1.translate")
+
+For many shakes with the same settings, a shakeSource evaluates
+one looping noise curve, and any number of shakeFollowers sample 
+it at their own time offset and scale. The noise is only evaluated
+when the source settings change, however many followers there are:
+
+    source = cmds.createNode("shakeSource")
+    follower = cmds.createNode("shakeFollower")
+    cmds.connectAttr("%s.curve" % source, "%s.sourceCurve" % follower)
+    cmds.connectAttr("time1.outTime", "%s.time" % follower)
+    cmds.setAttr("%s.timeOffset" % follower, 12.5)
+
+The createShakeFollowers command makes a source and a follower for
+each transform, each one spread seconds after the last, as a single
+undo step. shakeNodeCmd.createShakeFollowers() uses it:
+
+    nodes = cmds.createShakeFollowers("pCube1", "pCube2", spread=0.5)
+
+The outputX, outputY and outputZ children of the output can be
+connected on their own. Each one only computes its own axis, and
+is only dirtied by the time, the amplitude, frequency and enable of
+that axis, and the settings that all axes share.
+
+Turn on the cacheNoise attribute of a shakeNode to keep the noise
+of each time it has evaluated. Scrubbing back over the same frames
+then looks them up instead of evaluating the octaves again.
+
+Turn on the profile attribute of a shakeNode to count its
+compute calls and time. shakeNodeCmd.reportShakeNodes() sums 
+them up for every shakeNode in the scene.
+
+The bakeShakeNodes command replaces shakeNodes with animCurves
+as a single undo step. shakeNodeCmd.bakeShakeNodes() uses it:
+
+    cmds.bakeShakeNodes(shake, start=1, end=120)
+
 """
 
 import math, sys, random
+from timeit import default_timer
 
 # pnoise.py should be in the same directory
-from pnoise import pnoise
+from pnoise import get_generator, fbm_octaves, NoiseBank, BASES, PERLIN
+
+# numpy is needed to evaluate all of the shakeArrayNode 
+# channels at once. Without it, they are evaluated one by one.
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
 import maya.OpenMaya as OpenMaya
+import maya.OpenMayaAnim as OpenMayaAnim
 import maya.OpenMayaMPx as OpenMayaMPx
 
+# shakeNodeCmd.py holds the steps of the bake command,
+# and should be found on the python path like pnoise.py
+import shakeNodeCmd
+
 # give our node a name
 kPluginNodeTypeName = "shakeNode"
 
@@ -68,6 +126,32 @@ kPluginNodeTypeName = "shakeNode"
 # http://tinyurl.com/MTypeId
 shakeNodeId = OpenMaya.MTypeId(0x90000)
 
+kArrayNodeTypeName = "shakeArrayNode"
+shakeArrayNodeId = OpenMaya.MTypeId(0x90001)
+
+# the bulk creation command
+kCreateCmdName = "createShakeNodes"
+
+# the undoable shakeSource and shakeFollowers creation command,
+# used by shakeNodeCmd.createShakeFollowers()
+kFollowersCmdName = "createShakeFollowers"
+kFollowersSpreadFlag = "-sp"
+kFollowersSpreadLongFlag = "-spread"
+
+# the undoable bake command, used by shakeNodeCmd.bakeShakeNodes()
+kBakeCmdName = "bakeShakeNodes"
+kBakeStartFlag = "-s"
+kBakeStartLongFlag = "-start"
+kBakeEndFlag = "-e"
+kBakeEndLongFlag = "-end"
+
+# shakeNode2 (in shakeNode2.py) uses 0x90002
+kSourceNodeTypeName = "shakeSource"
+shakeSourceId = OpenMaya.MTypeId(0x90003)
+
+kFollowerNodeTypeName = "shakeFollower"
+shakeFollowerId = OpenMaya.MTypeId(0x90004)
+
 
 # Node definition
 # MPxNode is the base class for any type of new node in Maya
@@ -79,19 +163,83 @@ class ShakeNode(OpenMayaMPx.MPxNode):
 
 	# input attributes
 	amp 	= OpenMaya.MObject()
+	ampX 	= OpenMaya.MObject()
+	ampY 	= OpenMaya.MObject()
+	ampZ 	= OpenMaya.MObject()
 	freq 	= OpenMaya.MObject()
+	freqX 	= OpenMaya.MObject()
+	freqY 	= OpenMaya.MObject()
+	freqZ 	= OpenMaya.MObject()
 	seed 	= OpenMaya.MObject()
 	time 	= OpenMaya.MObject()
 	octaves = OpenMaya.MObject()
+	noiseType = OpenMaya.MObject()
+	enable 	= OpenMaya.MObject()
+	enableX = OpenMaya.MObject()
+	enableY = OpenMaya.MObject()
+	enableZ = OpenMaya.MObject()
+	tolerance = OpenMaya.MObject()
+	cacheNoise = OpenMaya.MObject()
+	bake 	= OpenMaya.MObject()
+	bakeStart = OpenMaya.MObject()
+	bakeEnd = OpenMaya.MObject()
+	profile = OpenMaya.MObject()
 
 	# output attributes
 	output 	= OpenMaya.MObject()
+	outputX = OpenMaya.MObject()
+	outputY = OpenMaya.MObject()
+	outputZ = OpenMaya.MObject()
+	outputVelocity = OpenMaya.MObject()
+
+	# internal attributes
+	bakedCache = OpenMaya.MObject()
+	octaveSeriesX = OpenMaya.MObject()
+	octaveSeriesY = OpenMaya.MObject()
+	octaveSeriesZ = OpenMaya.MObject()
+
+	# the x, y, z children of output, and the octave 
+	# series of each axis, set by nodeInitializer()
+	outputAxes = ()
+	octaveSeriesAxes = ()
+
+	# read only profiling attributes
+	computeCount = OpenMaya.MObject()
+	computeTime = OpenMaya.MObject()
+	averageOctaves = OpenMaya.MObject()
 
 
 	# Should make sure to call the init on the superclass
-	# Though we arent doing anything special in the __init__()
 	def __init__(self):
 		super(ShakeNode, self).__init__()
+
+		# A pnoise sampler for each axis, or None when the axis
+		# has no shake. They are made when the octave series of 
+		# the axis is computed, so they always match its settings.
+		# The samplers remember the last lattice cell, which saves
+		# work while playing back frame by frame.
+		self._samplers = [None, None, None]
+
+		# Profiling counters, only updated while profile is on
+		self._profiling = False
+		self._computeCount = 0
+		self._computeTime = 0.0
+		self._samples = 0
+		self._octavesEvaluated = 0
+
+		# How many compute() calls are running. Pulling the octave
+		# series or the baked samples calls compute() again from
+		# inside compute(), and only the outermost one is profiled.
+		self._computeDepth = 0
+
+
+	# Tells the parallel evaluation manager that any number of
+	# shakeNodes can compute at the same time. compute() only changes
+	# the samplers of its own node, and the pnoise generators it shares
+	# with other nodes are read only, apart from their caches, which
+	# are safe to share between threads.
+	def schedulingType(self):
+		return OpenMayaMPx.MPxNode.kParallel
 	
 
 	# The compute method is an override that
@@ -101,23 +249,114 @@ class ShakeNode(OpenMayaMPx.MPxNode):
 	# to you during this evaluation.
 	def compute(self, plug, dataBlock):
 
-		# we are only computing a single output plug
-		if ( plug == self.output ):
+		# The calls nested in another one are timed and 
+		# counted as part of it
+		outermost = self._computeDepth == 0
+		if outermost:
+			self._profiling = dataBlock.inputValue(self.profile).asBool()
+			start = default_timer()
+
+		self._computeDepth += 1
+		try:
+			status = self.computeShake(plug, dataBlock)
+		finally:
+			self._computeDepth -= 1
+
+		if outermost and self._profiling:
+			self.updateProfile(dataBlock, default_timer() - start)
+		return status
+
+
+	def computeShake(self, plug, dataBlock):
+
+		# The baked samples of the output. This does not depend
+		# on the time, so it is only computed again when one of
+		# the other inputs changes.
+		if plug == self.bakedCache:
+			self.computeBakedCache(dataBlock)
+			return OpenMaya.MStatus.kSuccess
+
+		# The octave series and the sampler of an axis. Like the
+		# baked samples, it does not depend on the time.
+		for axis, attr in enumerate(self.octaveSeriesAxes):
+			if plug == attr:
+				self.computeOctaveSeries(axis, dataBlock)
+				return OpenMaya.MStatus.kSuccess
+
+		# A single axis of the output, which only needs its own
+		# noise. The time is the only input read here when the
+		# settings of the axis have not changed.
+		for axis, attr in enumerate(self.outputAxes):
+			if plug == attr:
+				mTime	= dataBlock.inputValue(self.time).asTime()
+				secs	= float(mTime.asUnits(mTime.kSeconds))
+
+				baked = None
+				if dataBlock.inputValue(self.bake).asBool():
+					baked = self.lookupBakedCache(dataBlock, secs)
+
+				if baked is not None:
+					value = baked[axis]
+					self.countBakedLookup((axis,), dataBlock)
+				else:
+					value = self.sampleAxis(axis, secs, dataBlock)
+
+				outputHandle = dataBlock.outputValue(attr)
+				outputHandle.setFloat(value)
+				dataBlock.setClean(attr)
+
+				return OpenMaya.MStatus.kSuccess
+
+		# Otherwise the children are computed with their parent
+		if plug.isChild():
+			plug = plug.parent()
+
+		# The output, and optionally its velocity
+		if ( plug == self.output or plug == self.outputVelocity ):
 
-			# Get all of the input values from the datablock,
-			# using our attribute references.
-			amp 	= dataBlock.inputValue(self.amp).asFloat3()
-			freq 	= dataBlock.inputValue(self.freq).asFloat3()
 			mTime	= dataBlock.inputValue(self.time).asTime()
-			octaves	= dataBlock.inputValue(self.octaves).asInt()
-			seed 	= dataBlock.inputValue(self.seed).asLong()
 			secs	= float(mTime.asUnits(mTime.kSeconds))
 
-			# We use an offset seed number for the Y axis
-			# to make sure that the curves are not identical
-			x = self.getShake(secs, freq[0], amp[0], seed, octaves)
-			y = self.getShake(secs, freq[1], amp[1], seed + 250, octaves)	
-			z = self.getShake(secs, freq[2], amp[2], seed + 500, octaves)		
+			baked = None
+			if plug != self.outputVelocity and dataBlock.inputValue(self.bake).asBool():
+				baked = self.lookupBakedCache(dataBlock, secs)
+
+			if baked is not None:
+				x, y, z = baked
+				self.countBakedLookup((0, 1, 2), dataBlock)
+
+			# The samplers are kept up to date by the octave series,
+			# so no other input is read to play back the noise
+			elif plug != self.outputVelocity:
+				x, y, z = [self.sampleAxis(axis, secs, dataBlock) for axis in range(3)]
+
+			# The velocity comes almost for free with the output,
+			# so we set both of them
+			else:
+				# Get all of the input values from the datablock,
+				# using our attribute references.
+				amp 	= self.getAmplitude(dataBlock)
+				freq 	= dataBlock.inputValue(self.freq).asFloat3()
+				octaves	= dataBlock.inputValue(self.octaves).asInt()
+				seed 	= dataBlock.inputValue(self.seed).asLong()
+				basis 	= BASES[dataBlock.inputValue(self.noiseType).asShort()]
+				tol 	= dataBlock.inputValue(self.tolerance).asFloat()
+
+				# Each axis gets its own seed, and so its own noise
+				# generator, to make sure that the curves are not identical
+				x, vx = self.getShakeVelocity(secs, freq[0], amp[0], seed * 3, octaves, basis, tol)
+				y, vy = self.getShakeVelocity(secs, freq[1], amp[1], seed * 3 + 1, octaves, basis, tol)
+				z, vz = self.getShakeVelocity(secs, freq[2], amp[2], seed * 3 + 2, octaves, basis, tol)
+				self.countOctaves(1, freq, amp, octaves, tol)
+
+				velocityHandle = dataBlock.outputValue(self.outputVelocity)
+				velocityHandle.set3Float(vx, vy, vz)
+				dataBlock.setClean(self.outputVelocity)
+
+				# A baked output is looked up when it is asked for,
+				# instead of being set to the live noise here
+				if dataBlock.inputValue(self.bake).asBool():
+					return OpenMaya.MStatus.kSuccess
 
 			outputHandle = dataBlock.outputValue(self.output)
 			outputHandle.set3Float(x, y, z)
@@ -128,44 +367,780 @@ class ShakeNode(OpenMayaMPx.MPxNode):
 			# input plug gets modified. Though since one
 			# of our inputs is a time value, this node will
 			# re-evaluate on every frame.
-			dataBlock.setClean(plug)
+			dataBlock.setClean(self.output)
+			for attr in self.outputAxes:
+				dataBlock.setClean(attr)
 
 			return OpenMaya.MStatus.kSuccess
 
 		return OpenMaya.kUnknownParameter
 
 
-	def getShake(self, t, freq, amp, seed=0, octaves=3):
+	def computeOctaveSeries(self, axis, dataBlock):
+		"""
+		computeOctaveSeries (int axis, MDataBlock dataBlock)
+
+			Make the sampler of axis (0, 1 or 2) for the current settings,
+			and store the frequency of each octave it evaluates, followed 
+			by their amplitudes, in the octave series of the axis.
+		"""
+		amp 	= self.getAmplitude(dataBlock)[axis]
+		freq 	= dataBlock.inputValue(self.freq).asFloat3()[axis]
+		octaves	= dataBlock.inputValue(self.octaves).asInt()
+		seed 	= dataBlock.inputValue(self.seed).asLong()
+		basis 	= BASES[dataBlock.inputValue(self.noiseType).asShort()]
+		tol 	= dataBlock.inputValue(self.tolerance).asFloat()
+		cache 	= dataBlock.inputValue(self.cacheNoise).asBool()
+
+		sampler = None
+		freqs = amps = []
+		if amp != 0 and freq != 0:
+			sampler = get_generator(seed * 3 + axis).sampler(freq, amp, octaves, basis=basis, 
+															 tolerance=tol, cache=cache)
+			freqs, amps = sampler.octave_series()
+		self._samplers[axis] = sampler
+
+		values = OpenMaya.MDoubleArray()
+		for value in freqs + amps:
+			values.append(value)
+
+		attr = self.octaveSeriesAxes[axis]
+		data = OpenMaya.MFnDoubleArrayData()
+		seriesHandle = dataBlock.outputValue(attr)
+		seriesHandle.setMObject(data.create(values))
+		dataBlock.setClean(attr)
+
+
+	def sampleAxis(self, axis, t, dataBlock):
+		"""
+		sampleAxis (int axis, float t, MDataBlock dataBlock) -> float noise
+
+			The output of axis (0, 1 or 2) at t seconds. Reading the 
+			octave series first makes sure that the sampler matches 
+			the settings, which only costs a computeOctaveSeries() 
+			call when they have changed.
+		"""
+		series = dataBlock.inputValue(self.octaveSeriesAxes[axis])
+
+		sampler = self._samplers[axis]
+		if sampler is None:
+			return 0.0
+
+		if self._profiling:
+			self._samples += 1
+			self._octavesEvaluated += OpenMaya.MFnDoubleArrayData(series.data()).length() // 2
+
+		return sampler.sample(t)
+
+
+	def computeBakedCache(self, dataBlock):
+		"""
+		computeBakedCache (MDataBlock dataBlock)
+
+			Evaluate the output at every frame from bakeStart to bakeEnd,
+			in the current time unit, and store it in bakedCache.
+			bakeStart and bakeEnd are rounded to whole frames, so that 
+			the samples land on the frames that are played back.
+			The cache starts with the start time and the step between
+			samples in seconds, followed by the x, y, z of each sample.
+		"""
+		amp 	= self.getAmplitude(dataBlock)
+		freq 	= dataBlock.inputValue(self.freq).asFloat3()
+		octaves	= dataBlock.inputValue(self.octaves).asInt()
+		seed 	= dataBlock.inputValue(self.seed).asLong()
+		basis 	= BASES[dataBlock.inputValue(self.noiseType).asShort()]
+		tol 	= dataBlock.inputValue(self.tolerance).asFloat()
+		unit 	= OpenMaya.MTime.uiUnit()
+		first 	= round(dataBlock.inputValue(self.bakeStart).asTime().asUnits(unit))
+		last 	= round(dataBlock.inputValue(self.bakeEnd).asTime().asUnits(unit))
+
+		start = OpenMaya.MTime(first, unit).asUnits(OpenMaya.MTime.kSeconds)
+		step = OpenMaya.MTime(1.0, unit).asUnits(OpenMaya.MTime.kSeconds)
+		count = max(0, int(last - first) + 1)
+
+		axes = [self.bakeShake(start, step, count, freq[i], amp[i], seed * 3 + i, octaves, basis, tol)
+				for i in range(3)]
+		self.countOctaves(count, freq, amp, octaves, tol)
+
+		values = OpenMaya.MDoubleArray(2 + count * 3, 0.0)
+		values.set(start, 0)
+		values.set(step, 1)
+		for i in range(count):
+			values.set(axes[0][i], 2 + i * 3)
+			values.set(axes[1][i], 3 + i * 3)
+			values.set(axes[2][i], 4 + i * 3)
+
+		data = OpenMaya.MFnDoubleArrayData()
+		cacheHandle = dataBlock.outputValue(self.bakedCache)
+		cacheHandle.setMObject(data.create(values))
+		dataBlock.setClean(self.bakedCache)
+
+
+	def countOctaves(self, count, freq, amp, octaves, tolerance):
+		"""
+		countOctaves (int count, list freq, list amp, int octaves, float tolerance)
+
+			Add count samples of each axis in freq and amp to the profiling
+			counters, along with the number of octaves that each of them
+			evaluated. Like in sampleAxis(), an axis with no shake (a
+			frequency or amplitude of 0, or disabled) is not counted.
+		"""
+		if not self._profiling:
+			return
+
+		for f, a in zip(freq, amp):
+			if a != 0 and f != 0:
+				self._samples += count
+				self._octavesEvaluated += count * fbm_octaves(a, octaves, tolerance=tolerance)
+
+
+	def countBakedLookup(self, axes, dataBlock):
+		"""
+		countBakedLookup (list axes, MDataBlock dataBlock)
+
+			Count a lookup of each of axes in the baked samples, as a
+			sample of 0 octaves. The axes with no shake are not counted.
+		"""
+		if not self._profiling:
+			return
+
+		amp 	= self.getAmplitude(dataBlock)
+		freq 	= dataBlock.inputValue(self.freq).asFloat3()
+		self.countOctaves(1, [freq[axis] for axis in axes], [amp[axis] for axis in axes], 0, 0)
+
+
+	def updateProfile(self, dataBlock, seconds):
+		"""
+		updateProfile (MDataBlock dataBlock, float seconds)
+
+			Count a compute() call that took seconds, and set the
+			profiling attributes. They are not affected by any input,
+			so they keep these values until the next compute().
+		"""
+		self._computeCount += 1
+		self._computeTime += seconds
+
+		average = 0.0
+		if self._samples:
+			average = self._octavesEvaluated / float(self._samples)
+
+		dataBlock.outputValue(self.computeCount).setInt(self._computeCount)
+		dataBlock.outputValue(self.computeTime).setDouble(self._computeTime)
+		dataBlock.outputValue(self.averageOctaves).setFloat(average)
+
+		for attr in (self.computeCount, self.computeTime, self.averageOctaves):
+			dataBlock.setClean(attr)
+
+
+	def getAmplitude(self, dataBlock):
+		"""
+		getAmplitude (MDataBlock dataBlock) -> list amp
+
+			The amplitude of each axis, with the disabled
+			axes set to 0 so that they skip the noise
+		"""
+		amp = list(dataBlock.inputValue(self.amp).asFloat3())
+
+		enable = dataBlock.inputValue(self.enable)
+		for i, attr in enumerate((self.enableX, self.enableY, self.enableZ)):
+			if not enable.child(attr).asBool():
+				amp[i] = 0
+
+		return amp
+
+
+	def lookupBakedCache(self, dataBlock, t):
+		"""
+		lookupBakedCache (MDataBlock dataBlock, float t) -> (x, y, z) or None
+
+			The output at t seconds, linearly interpolated between
+			the two nearest baked samples. Returns None when t is
+			outside of the baked range.
+		"""
+		data = OpenMaya.MFnDoubleArrayData(dataBlock.inputValue(self.bakedCache).data())
+		values = data.array()
+
+		count = (values.length() - 2) // 3
+		if count < 1:
+			return None
+
+		pos = (t - values[0]) / values[1]
+		i = int(math.floor(pos))
+		if i < 0 or i >= count or (i == count - 1 and pos > i):
+			return None
+
+		frac = pos - i
+		j = min(i + 1, count - 1)
+
+		a = 2 + i * 3
+		b = 2 + j * 3
+		return tuple(values[a + k] + frac * (values[b + k] - values[a + k]) for k in range(3))
+
+
+	def bakeShake(self, start, step, count, freq, amp, seed=0, octaves=3, basis=PERLIN, 
+				  tolerance=0):
+		"""
+		bakeShake (float start, float step, int count, float freq, float amp, 
+				   int seed = 0, int octaves = 3, string basis = PERLIN, 
+				   float tolerance = 0) -> list noise
+
+			getShake() of count times from start, every step seconds
+		"""
+
+		if amp == 0 or freq == 0:
+			return [0] * count
+
+		if numpy is not None:
+			t = start + numpy.arange(count) * step
+			return self.getShake(t, freq, amp, seed, octaves, basis, tolerance).tolist()
+
+		sampler = get_generator(seed).sampler(freq, amp, octaves, basis=basis, tolerance=tolerance)
+		return [sampler.sample(start + i * step) for i in range(count)]
+
+
+	def getShake(self, t, freq, amp, seed=0, octaves=3, basis=PERLIN, tolerance=0):
 		"""
-		getShake (float t, float freq, float amp, int seed = 0, int octaves = 3) -> float noise
+		getShake (float t, float freq, float amp, int seed = 0, int octaves = 3,
+				  string basis = PERLIN, float tolerance = 0) -> float noise
 
-			A wrapper around the pnoise() function that produces a fractal sum
+			A wrapper around the pnoise fbm() function that produces a fractal sum
 			by using the octaves value to generate values multiple times
 			with increasing frequency and decreasing amplitude.
+			Each seed uses its own noise generator, which are cached and
+			shared between all of the nodes using that seed.
 
-			float t  	- the time value, or other changing value
+			float t  	- the time value, or other changing value. May be a numpy array
 			float freq 	- fequency of the curve values (speed)
 			float amp 	- amplitude of the curve values (intensity)
 			int seed 	- Any random number. The seed number lets you change the randomization
 			int octaves - Creates finer detail (jitter) in the curve values
+			string basis - The pnoise basis to use, PERLIN or SIMPLEX
+			float tolerance - Octaves with an amplitude below this are skipped
 		"""
 
-		val = 0
-
 		if amp == 0 or freq == 0:
-			return val
-		
-		# underscore is a special symbol to throw away the
-		# value since we dont care about it.
-		for _ in range(octaves):
-
-			val += pnoise( (t + seed) * freq ) * amp
-			
-			# modify the freq and amp for the next octave
-			freq *= 2
-			amp /= 2 
+			return 0
 		
-		return val
+		# fbm() does the octave loop for us, doubling the
+		# frequency and halving the amplitude each time
+		return get_generator(seed).fbm(t, freq, amp, octaves, basis=basis, tolerance=tolerance)
+
+
+	def getShakeVelocity(self, t, freq, amp, seed=0, octaves=3, basis=PERLIN, tolerance=0):
+		"""
+		getShakeVelocity (float t, float freq, float amp, int seed = 0, int octaves = 3,
+						  string basis = PERLIN, float tolerance = 0) -> (float noise, float velocity)
+
+			The same as getShake(), but also returns the rate of change of
+			the noise with respect to t, from the analytic derivative.
+		"""
+
+		if amp == 0 or freq == 0:
+			return 0, 0
+
+		return get_generator(seed).fbm_deriv(t, freq, amp, octaves, basis=basis, tolerance=tolerance)
+
+
+# The array version of ShakeNode.
+# Each element of the channel input is one shake, with its own
+# amplitude, frequency and seed. Every channel is evaluated in
+# the same compute(), so the DG overhead is paid once per frame
+# instead of once per shaken object.
+class ShakeArrayNode(OpenMayaMPx.MPxNode):
+
+	# input attributes
+	channel = OpenMaya.MObject()
+	amp 	= OpenMaya.MObject()
+	freq 	= OpenMaya.MObject()
+	seed 	= OpenMaya.MObject()
+	time 	= OpenMaya.MObject()
+	octaves = OpenMaya.MObject()
+	noiseType = OpenMaya.MObject()
+
+	# output attributes
+	output 	= OpenMaya.MObject()
+
+
+	def __init__(self):
+		super(ShakeArrayNode, self).__init__()
+
+		# The pnoise NoiseBank for the current seeds
+		self._bank = None
+		self._bankKey = None
+
+
+	# Safe to compute in parallel, like ShakeNode
+	def schedulingType(self):
+		return OpenMayaMPx.MPxNode.kParallel
+
+
+	def compute(self, plug, dataBlock):
+
+		# The plug may be one of the output elements,
+		# or one of their x, y, z children
+		if plug.isChild():
+			plug = plug.parent()
+		if plug.isElement():
+			plug = plug.array()
+
+		if plug == self.output:
+
+			mTime	= dataBlock.inputValue(self.time).asTime()
+			octaves	= dataBlock.inputValue(self.octaves).asInt()
+			secs	= float(mTime.asUnits(mTime.kSeconds))
+			basis 	= BASES[dataBlock.inputValue(self.noiseType).asShort()]
+
+			# Gather the settings of every channel, by
+			# their logical index
+			indices = []
+			amps 	= []
+			freqs 	= []
+			seeds 	= []
+
+			channels = dataBlock.inputArrayValue(self.channel)
+			for i in range(channels.elementCount()):
+				channels.jumpToArrayElement(i)
+				element = channels.inputValue()
+
+				indices.append(channels.elementIndex())
+				amps.extend(element.child(self.amp).asFloat3())
+				freqs.extend(element.child(self.freq).asFloat3())
+
+				# The same seed per axis as a ShakeNode, so that
+				# a channel matches a ShakeNode with the same settings
+				seed = element.child(self.seed).asLong()
+				seeds.extend((seed * 3, seed * 3 + 1, seed * 3 + 2))
+
+			values = self.getShakes(secs, freqs, amps, seeds, octaves, basis)
+
+			outputs = dataBlock.outputArrayValue(self.output)
+			builder = OpenMaya.MArrayDataBuilder(dataBlock, self.output, len(indices))
+			for i, index in enumerate(indices):
+				handle = builder.addElement(index)
+				handle.set3Float(values[i * 3], values[i * 3 + 1], values[i * 3 + 2])
+
+			outputs.set(builder)
+			outputs.setAllClean()
+			dataBlock.setClean(self.output)
+
+			return OpenMaya.MStatus.kSuccess
+
+		return OpenMaya.kUnknownParameter
+
+
+	def getShakes(self, t, freqs, amps, seeds, octaves=3, basis=PERLIN):
+		"""
+		getShakes (float t, list freqs, list amps, list seeds, int octaves = 3,
+				   string basis = PERLIN) -> list noise
+
+			ShakeNode.getShake() for each of the freqs, amps and seeds,
+			evaluated together with a pnoise NoiseBank. The bank is 
+			kept until the seeds or basis change.
+		"""
+
+		if numpy is None:
+			values = []
+			for f, a, s in zip(freqs, amps, seeds):
+				if a == 0 or f == 0:
+					values.append(0)
+				else:
+					values.append(get_generator(s).fbm(t, f, a, octaves, basis=basis))
+			return values
+
+		key = (tuple(seeds), basis)
+		if key != self._bankKey:
+			self._bank = NoiseBank(seeds, basis)
+			self._bankKey = key
+
+		return self._bank.fbm(t, freqs, amps, octaves).tolist()
+
+
+# Evaluates one loop of a shake curve for every axis, with the
+# same settings as a shakeNode, into its curve output. The curve
+# does not depend on the time, so it is only evaluated again when
+# the settings change. shakeFollower nodes play it back.
+class ShakeSourceNode(OpenMayaMPx.MPxNode):
+
+	# input attributes
+	amp 	= OpenMaya.MObject()
+	freq 	= OpenMaya.MObject()
+	seed 	= OpenMaya.MObject()
+	octaves = OpenMaya.MObject()
+	noiseType = OpenMaya.MObject()
+	loopLength = OpenMaya.MObject()
+	sampleRate = OpenMaya.MObject()
+
+	# output attributes
+	curve 	= OpenMaya.MObject()
+
+
+	def __init__(self):
+		super(ShakeSourceNode, self).__init__()
+
+
+	def schedulingType(self):
+		return OpenMayaMPx.MPxNode.kParallel
+
+
+	def compute(self, plug, dataBlock):
+
+		if plug == self.curve:
+
+			amp 	= dataBlock.inputValue(self.amp).asFloat3()
+			freq 	= dataBlock.inputValue(self.freq).asFloat3()
+			octaves	= dataBlock.inputValue(self.octaves).asInt()
+			seed 	= dataBlock.inputValue(self.seed).asLong()
+			basis 	= BASES[dataBlock.inputValue(self.noiseType).asShort()]
+			length 	= dataBlock.inputValue(self.loopLength).asFloat()
+			rate 	= dataBlock.inputValue(self.sampleRate).asFloat()
+
+			resolution = max(2, int(round(length * rate)))
+
+			# the loop length, the number of samples per axis,
+			# then the samples of x, y and z
+			values = OpenMaya.MDoubleArray()
+			values.append(length)
+			values.append(resolution)
+
+			for i in range(3):
+				if amp[i] == 0 or freq[i] == 0:
+					samples = [0.0] * resolution
+				else:
+					table = get_generator(seed * 3 + i).bake_loop(length, resolution, 
+																  freq[i], amp[i], octaves, basis=basis)
+					samples = table.values
+				for value in samples:
+					values.append(value)
+
+			data = OpenMaya.MFnDoubleArrayData()
+			curveHandle = dataBlock.outputValue(self.curve)
+			curveHandle.setMObject(data.create(values))
+			dataBlock.setClean(plug)
+
+			return OpenMaya.MStatus.kSuccess
+
+		return OpenMaya.kUnknownParameter
+
+
+# Plays back the curve of a shakeSource at its own time
+# offset and scale. This is only a table lookup, so many
+# followers cost about the same as one.
+class ShakeFollowerNode(OpenMayaMPx.MPxNode):
+
+	# input attributes
+	sourceCurve = OpenMaya.MObject()
+	time 	= OpenMaya.MObject()
+	timeOffset = OpenMaya.MObject()
+	scale 	= OpenMaya.MObject()
+
+	# output attributes
+	output 	= OpenMaya.MObject()
+
+
+	def __init__(self):
+		super(ShakeFollowerNode, self).__init__()
+
+
+	def schedulingType(self):
+		return OpenMayaMPx.MPxNode.kParallel
+
+
+	def compute(self, plug, dataBlock):
+
+		if plug == self.output:
+
+			mTime	= dataBlock.inputValue(self.time).asTime()
+			secs	= float(mTime.asUnits(mTime.kSeconds))
+			offset 	= dataBlock.inputValue(self.timeOffset).asFloat()
+			scale 	= dataBlock.inputValue(self.scale).asFloat3()
+
+			# an unconnected sourceCurve has no data at all
+			curve = dataBlock.inputValue(self.sourceCurve).data()
+			if curve.isNull():
+				x, y, z = 0.0, 0.0, 0.0
+			else:
+				data = OpenMaya.MFnDoubleArrayData(curve)
+				x, y, z = self.sampleCurve(data.array(), secs + offset)
+
+			outputHandle = dataBlock.outputValue(self.output)
+			outputHandle.set3Float(x * scale[0], y * scale[1], z * scale[2])
+			dataBlock.setClean(plug)
+
+			return OpenMaya.MStatus.kSuccess
+
+		return OpenMaya.kUnknownParameter
+
+
+	def sampleCurve(self, values, t):
+		"""
+		sampleCurve (MDoubleArray values, float t) -> (x, y, z)
+
+			The shakeSource curve at time t, wrapped into its loop
+			and interpolated between the two nearest samples, like
+			pnoise.LoopTable.sample()
+		"""
+		if values.length() < 2:
+			return 0.0, 0.0, 0.0
+
+		length = values[0]
+		size = int(values[1])
+		if size < 1 or values.length() < 2 + size * 3:
+			return 0.0, 0.0, 0.0
+
+		pos = (t % length) / (length / size)
+		i = int(pos)
+		frac = pos - i
+		a = i % size
+		b = (i + 1) % size
+
+		out = []
+		for axis in range(3):
+			base = 2 + axis * size
+			out.append(values[base + a] + frac * (values[base + b] - values[base + a]))
+		return out
+
+
+# A command that creates a shakeNode for each of the given
+# transforms (or the selected ones), connected to time1 and to
+# the translate of the transform. All of the nodes and 
+# connections are made by one MDGModifier, so this is a single
+# undoable step however many transforms there are.
+#
+# MEL:	createShakeNodes pCube1 pCube2;
+class CreateShakeNodesCmd(OpenMayaMPx.MPxCommand):
+
+	def __init__(self):
+		super(CreateShakeNodesCmd, self).__init__()
+		self._modifier = None
+		self._nodes = []
+
+
+	def doIt(self, args):
+
+		argData = OpenMaya.MArgDatabase(self.syntax(), args)
+		selection = OpenMaya.MSelectionList()
+		argData.getObjects(selection)
+
+		transforms = []
+		for i in range(selection.length()):
+			obj = OpenMaya.MObject()
+			selection.getDependNode(i, obj)
+			if not obj.hasFn(OpenMaya.MFn.kTransform):
+				name = OpenMaya.MFnDependencyNode(obj).name()
+				_commandError("Not a transform: %s" % name)
+			transforms.append(obj)
+
+		timePlug = _findPlug("time1", "outTime")
+
+		self._modifier = OpenMaya.MDGModifier()
+		self._nodes = []
+
+		for transform in transforms:
+			shake = self._modifier.createNode(shakeNodeId)
+			self._nodes.append(shake)
+
+			self._modifier.connect(timePlug, OpenMaya.MPlug(shake, ShakeNode.time))
+			_queueTranslate(self._modifier, OpenMaya.MPlug(shake, ShakeNode.output), transform)
+
+		self.redoIt()
+
+
+	def redoIt(self):
+		self._modifier.doIt()
+
+		self.clearResult()
+		for node in self._nodes:
+			self.appendToResult(OpenMaya.MFnDependencyNode(node).name())
+
+
+	def undoIt(self):
+		self._modifier.undoIt()
+
+
+	def isUndoable(self):
+		return True
+
+
+# A command that creates one shakeSource, and a shakeFollower for
+# each of the given transforms (or the selected ones), connected to
+# the curve of the source, to time1 and to the translate of the 
+# transform. Each follower plays the curve spread seconds after the
+# one before it. Like createShakeNodes, one MDGModifier makes every
+# node, connection and time offset, as a single undoable step.
+# Returns the source, followed by the followers.
+#
+# MEL:	createShakeFollowers -spread 0.5 pCube1 pCube2;
+class CreateShakeFollowersCmd(OpenMayaMPx.MPxCommand):
+
+	def __init__(self):
+		super(CreateShakeFollowersCmd, self).__init__()
+		self._modifier = None
+		self._nodes = []
+
+
+	def doIt(self, args):
+
+		argData = OpenMaya.MArgDatabase(self.syntax(), args)
+		selection = OpenMaya.MSelectionList()
+		argData.getObjects(selection)
+
+		spread = 1.0
+		if argData.isFlagSet(kFollowersSpreadFlag):
+			spread = argData.flagArgumentDouble(kFollowersSpreadFlag, 0)
+
+		transforms = []
+		for i in range(selection.length()):
+			obj = OpenMaya.MObject()
+			selection.getDependNode(i, obj)
+			if not obj.hasFn(OpenMaya.MFn.kTransform):
+				name = OpenMaya.MFnDependencyNode(obj).name()
+				_commandError("Not a transform: %s" % name)
+			transforms.append(obj)
+
+		timePlug = _findPlug("time1", "outTime")
+
+		self._modifier = OpenMaya.MDGModifier()
+
+		source = self._modifier.createNode(shakeSourceId)
+		curvePlug = OpenMaya.MPlug(source, ShakeSourceNode.curve)
+		self._nodes = [source]
+
+		for i, transform in enumerate(transforms):
+			follower = self._modifier.createNode(shakeFollowerId)
+			self._nodes.append(follower)
+
+			self._modifier.connect(curvePlug, OpenMaya.MPlug(follower, ShakeFollowerNode.sourceCurve))
+			self._modifier.connect(timePlug, OpenMaya.MPlug(follower, ShakeFollowerNode.time))
+			self._modifier.newPlugValueFloat(OpenMaya.MPlug(follower, ShakeFollowerNode.timeOffset), 
+											 i * spread)
+			_queueTranslate(self._modifier, OpenMaya.MPlug(follower, ShakeFollowerNode.output), 
+							transform)
+
+		self.redoIt()
+
+
+	def redoIt(self):
+		self._modifier.doIt()
+
+		self.clearResult()
+		for node in self._nodes:
+			self.appendToResult(OpenMaya.MFnDependencyNode(node).name())
+
+
+	def undoIt(self):
+		self._modifier.undoIt()
+
+
+	def isUndoable(self):
+		return True
+
+
+# Bakes shakeNodes to animCurves, like shakeNodeCmd.bakeShakeNodes(),
+# as a single undo step. The connections, deleted unit conversions
+# and new curves go through one MDGModifier, and the keys are 
+# recorded in an MAnimCurveChange.
+#	bakeShakeNodes -start 1 -end 120 shakeNode1 shakeNode2;
+class BakeShakeNodesCmd(OpenMayaMPx.MPxCommand):
+
+	def __init__(self):
+		super(BakeShakeNodesCmd, self).__init__()
+		self._modifier = None
+		self._change = None
+		self._curves = []
+
+
+	def doIt(self, args):
+
+		argData = OpenMaya.MArgDatabase(self.syntax(), args)
+		selection = OpenMaya.MSelectionList()
+		argData.getObjects(selection)
+
+		nodes = []
+		for i in range(selection.length()):
+			obj = OpenMaya.MObject()
+			selection.getDependNode(i, obj)
+			node = OpenMaya.MFnDependencyNode(obj)
+			if node.typeId() != shakeNodeId:
+				_commandError("Not a shakeNode: %s" % node.name())
+			nodes.append(node.name())
+
+		# the playback range by default, in frames
+		unit = OpenMaya.MTime.uiUnit()
+		if argData.isFlagSet(kBakeStartFlag):
+			start = argData.flagArgumentDouble(kBakeStartFlag, 0)
+		else:
+			start = OpenMayaAnim.MAnimControl.minTime().asUnits(unit)
+		if argData.isFlagSet(kBakeEndFlag):
+			end = argData.flagArgumentDouble(kBakeEndFlag, 0)
+		else:
+			end = OpenMayaAnim.MAnimControl.maxTime().asUnits(unit)
+
+		self._modifier = OpenMaya.MDGModifier()
+		self._change = OpenMayaAnim.MAnimCurveChange()
+
+		keys = shakeNodeCmd.queueShakeBake(nodes, start, end, self._modifier)
+		self._modifier.doIt()
+		self._curves = [curve for curve, times, values in keys]
+		shakeNodeCmd.setShakeKeys(keys, self._change)
+
+		self.setCurveResult()
+
+
+	def redoIt(self):
+		self._modifier.doIt()
+		self._change.redoIt()
+		self.setCurveResult()
+
+
+	def undoIt(self):
+		self._change.undoIt()
+		self._modifier.undoIt()
+
+
+	def isUndoable(self):
+		return True
+
+
+	def setCurveResult(self):
+		self.clearResult()
+		for curve in self._curves:
+			self.appendToResult(OpenMaya.MFnDependencyNode(curve).name())
+
+
+def _queueTranslate(modifier, source, transform):
+	"""
+	Queue a connection from the source plug to the translate of
+	transform on modifier. Like connectAttr -force, it replaces
+	anything already connected to the translate or its children.
+	"""
+	translate = OpenMaya.MFnDependencyNode(transform).findPlug("translate")
+	for plug in [translate] + [translate.child(i) for i in range(translate.numChildren())]:
+		sources = OpenMaya.MPlugArray()
+		plug.connectedTo(sources, True, False)
+		for j in range(sources.length()):
+			modifier.disconnect(sources[j], plug)
+
+	modifier.connect(source, translate)
+
+
+def _commandError(message):
+	"""
+	Report an error in the arguments of a command in the script
+	editor, and fail the command before it has changed anything
+	"""
+	OpenMaya.MGlobal.displayError(message)
+	raise RuntimeError(message)
+
+
+def _findPlug(node, attr):
+	"""
+	Returns the MPlug of attr on the node with the given name
+	"""
+	selection = OpenMaya.MSelectionList()
+	selection.add(node)
+	obj = OpenMaya.MObject()
+	selection.getDependNode(0, obj)
+	return OpenMaya.MFnDependencyNode(obj).findPlug(attr)
 
 
 # Every node plugin needs a nodeCreate() method
@@ -174,6 +1149,46 @@ class ShakeNode(OpenMayaMPx.MPxNode):
 def nodeCreator():
 	return OpenMayaMPx.asMPxPtr( ShakeNode() )
 
+def arrayNodeCreator():
+	return OpenMayaMPx.asMPxPtr( ShakeArrayNode() )
+
+def sourceNodeCreator():
+	return OpenMayaMPx.asMPxPtr( ShakeSourceNode() )
+
+def followerNodeCreator():
+	return OpenMayaMPx.asMPxPtr( ShakeFollowerNode() )
+
+def createCmdCreator():
+	return OpenMayaMPx.asMPxPtr( CreateShakeNodesCmd() )
+
+# The transforms to shake, or the selection when none are given
+def createCmdSyntaxCreator():
+	syntax = OpenMaya.MSyntax()
+	syntax.setObjectType(OpenMaya.MSyntax.kSelectionList)
+	syntax.useSelectionAsDefault(True)
+	return syntax
+
+def followersCmdCreator():
+	return OpenMayaMPx.asMPxPtr( CreateShakeFollowersCmd() )
+
+def followersCmdSyntaxCreator():
+	syntax = OpenMaya.MSyntax()
+	syntax.addFlag(kFollowersSpreadFlag, kFollowersSpreadLongFlag, OpenMaya.MSyntax.kDouble)
+	syntax.setObjectType(OpenMaya.MSyntax.kSelectionList)
+	syntax.useSelectionAsDefault(True)
+	return syntax
+
+def bakeCmdCreator():
+	return OpenMayaMPx.asMPxPtr( BakeShakeNodesCmd() )
+
+def bakeCmdSyntaxCreator():
+	syntax = OpenMaya.MSyntax()
+	syntax.addFlag(kBakeStartFlag, kBakeStartLongFlag, OpenMaya.MSyntax.kDouble)
+	syntax.addFlag(kBakeEndFlag, kBakeEndLongFlag, OpenMaya.MSyntax.kDouble)
+	syntax.setObjectType(OpenMaya.MSyntax.kSelectionList)
+	syntax.useSelectionAsDefault(True)
+	return syntax
+
 
 # Maya expects this function, to initialize
 # the node class ONCE when the plugin is loaded
@@ -182,14 +1197,24 @@ def nodeInitializer():
 
 	nAttr = OpenMaya.MFnNumericAttribute()
 	uAttr = OpenMaya.MFnUnitAttribute()
+	eAttr = OpenMaya.MFnEnumAttribute()
+	tAttr = OpenMaya.MFnTypedAttribute()
 
 	# input
 
-	ShakeNode.amp = nAttr.create( "amplitude", "amp", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	# The amplitude and frequency have a child per axis,
+	# so that each one only affects its own axis of the output
+	ShakeNode.ampX = nAttr.create( "amplitudeX", "ampx", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.ampY = nAttr.create( "amplitudeY", "ampy", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.ampZ = nAttr.create( "amplitudeZ", "ampz", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.amp = nAttr.create( "amplitude", "amp", ShakeNode.ampX, ShakeNode.ampY, ShakeNode.ampZ )
 	nAttr.setStorable(True)
 	nAttr.setKeyable(True)
 
-	ShakeNode.freq = nAttr.create( "frequency", "freq", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	ShakeNode.freqX = nAttr.create( "frequencyX", "freqx", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.freqY = nAttr.create( "frequencyY", "freqy", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.freqZ = nAttr.create( "frequencyZ", "freqz", OpenMaya.MFnNumericData.kFloat, 1.0 )
+	ShakeNode.freq = nAttr.create( "frequency", "freq", ShakeNode.freqX, ShakeNode.freqY, ShakeNode.freqZ )
 	nAttr.setStorable(True)
 	nAttr.setKeyable(True)
 
@@ -202,15 +1227,110 @@ def nodeInitializer():
 	nAttr.setStorable(True)
 	nAttr.setKeyable(True)
 	nAttr.setMin(2)
+
+	# the fields must be in the same order as pnoise.BASES
+	ShakeNode.noiseType = eAttr.create( "noiseType", "nt", 0 )
+	eAttr.addField("Perlin", 0)
+	eAttr.addField("Simplex", 1)
+	eAttr.setStorable(True)
+	eAttr.setKeyable(False)
+
+	# Turns the shake of each axis on or off. A disabled
+	# axis outputs 0 without evaluating any noise.
+	ShakeNode.enableX = nAttr.create( "enableX", "enx", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode.enableY = nAttr.create( "enableY", "eny", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode.enableZ = nAttr.create( "enableZ", "enz", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode.enable = nAttr.create( "enable", "en", ShakeNode.enableX, ShakeNode.enableY, ShakeNode.enableZ )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	# Octaves with an amplitude below the tolerance are skipped,
+	# so subtle shakes evaluate fewer octaves. 0 keeps them all.
+	ShakeNode.tolerance = nAttr.create( "octaveTolerance", "otol", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+	nAttr.setMin(0.0)
+
+	# Keeps the noise of the times that have been evaluated, in
+	# the cache of the noise generators, for scrubbing. The cache
+	# is shared with the other shakeNodes that use the same seed.
+	ShakeNode.cacheNoise = nAttr.create( "cacheNoise", "cchn", OpenMaya.MFnNumericData.kBoolean, False )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
 	
 	# the time attribute should be connected to the default "time1" node
 	# or any time node to provide a changing time value
 	ShakeNode.time = uAttr.create( "currentTime", "time" , OpenMaya.MFnUnitAttribute.kTime,  0.0 )
 	uAttr.setHidden(True)
 	nAttr.setStorable(False)
+
+	# When bake is on, the output is looked up from samples baked
+	# at each frame from bakeStart to bakeEnd, instead of computing
+	# the noise. Outside of that range it is computed as usual.
+	ShakeNode.bake = nAttr.create( "bake", "bk", OpenMaya.MFnNumericData.kBoolean, False )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+
+	# The defaults are frames 1 and 120 in the time unit of the
+	# scene when the plugin is loaded
+	ShakeNode.bakeStart = uAttr.create( "bakeStart", "bks", OpenMaya.MTime(1.0, OpenMaya.MTime.uiUnit()) )
+	uAttr.setStorable(True)
+	uAttr.setKeyable(False)
+
+	ShakeNode.bakeEnd = uAttr.create( "bakeEnd", "bke", OpenMaya.MTime(120.0, OpenMaya.MTime.uiUnit()) )
+	uAttr.setStorable(True)
+	uAttr.setKeyable(False)
+
+	# The baked samples. It is computed from the other inputs like
+	# an output, so the DG throws it away whenever they change. 
+	# It is not saved with the scene, only baked again when needed.
+	ShakeNode.bakedCache = tAttr.create( "bakedCache", "bkc", OpenMaya.MFnData.kDoubleArray )
+	tAttr.setStorable(False)
+	tAttr.setWritable(False)
+	tAttr.setHidden(True)
+
+	# The frequency and amplitude of each octave of an axis.
+	# Computing it also makes the sampler of the axis, so the
+	# output only computes it again when a setting other than
+	# the time has changed.
+	ShakeNode.octaveSeriesX = tAttr.create( "octaveSeriesX", "octsx", OpenMaya.MFnData.kDoubleArray )
+	ShakeNode.octaveSeriesY = tAttr.create( "octaveSeriesY", "octsy", OpenMaya.MFnData.kDoubleArray )
+	ShakeNode.octaveSeriesZ = tAttr.create( "octaveSeriesZ", "octsz", OpenMaya.MFnData.kDoubleArray )
+	ShakeNode.octaveSeriesAxes = (ShakeNode.octaveSeriesX, ShakeNode.octaveSeriesY, ShakeNode.octaveSeriesZ)
+	for attr in ShakeNode.octaveSeriesAxes:
+		tAttr.setObject(attr)
+		tAttr.setStorable(False)
+		tAttr.setWritable(False)
+		tAttr.setHidden(True)
+
+	# When profile is on, each compute() updates the read only
+	# computeCount, computeTime (total seconds) and averageOctaves
+	# (octaves evaluated per sample of an axis, 0 for baked lookups).
+	# Axes with no shake are not evaluated, and not counted.
+	ShakeNode.profile = nAttr.create( "profile", "prf", OpenMaya.MFnNumericData.kBoolean, False )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+
+	ShakeNode.computeCount = nAttr.create( "computeCount", "cc", OpenMaya.MFnNumericData.kInt, 0 )
+	ShakeNode.computeTime = nAttr.create( "computeTime", "ct", OpenMaya.MFnNumericData.kDouble, 0.0 )
+	ShakeNode.averageOctaves = nAttr.create( "averageOctaves", "aoct", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	for attr in (ShakeNode.computeCount, ShakeNode.computeTime, ShakeNode.averageOctaves):
+		nAttr.setObject(attr)
+		nAttr.setStorable(False)
+		nAttr.setWritable(False)
 		
-	# output
-	ShakeNode.output = nAttr.create( "output", "out", OpenMaya.MFnNumericData.k3Float, 0.0 )
+	# output, with a child per axis like the amplitude
+	ShakeNode.outputX = nAttr.create( "outputX", "outx", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	ShakeNode.outputY = nAttr.create( "outputY", "outy", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	ShakeNode.outputZ = nAttr.create( "outputZ", "outz", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	ShakeNode.outputAxes = (ShakeNode.outputX, ShakeNode.outputY, ShakeNode.outputZ)
+	ShakeNode.output = nAttr.create( "output", "out", ShakeNode.outputX, ShakeNode.outputY, ShakeNode.outputZ )
+	nAttr.setStorable(False)
+	nAttr.setWritable(False)
+	nAttr.setHidden(False)
+
+	# the rate of change of the output, in units per second
+	ShakeNode.outputVelocity = nAttr.create( "outputVelocity", "outv", OpenMaya.MFnNumericData.k3Float, 0.0 )
 	nAttr.setStorable(False)
 	nAttr.setWritable(False)
 	nAttr.setHidden(False)
@@ -222,17 +1342,238 @@ def nodeInitializer():
 	ShakeNode.addAttribute( ShakeNode.seed )
 	ShakeNode.addAttribute( ShakeNode.time )
 	ShakeNode.addAttribute( ShakeNode.octaves )
+	ShakeNode.addAttribute( ShakeNode.noiseType )
+	ShakeNode.addAttribute( ShakeNode.enable )
+	ShakeNode.addAttribute( ShakeNode.tolerance )
+	ShakeNode.addAttribute( ShakeNode.cacheNoise )
+	ShakeNode.addAttribute( ShakeNode.bake )
+	ShakeNode.addAttribute( ShakeNode.bakeStart )
+	ShakeNode.addAttribute( ShakeNode.bakeEnd )
 	ShakeNode.addAttribute( ShakeNode.output )
+	ShakeNode.addAttribute( ShakeNode.outputVelocity )
+	ShakeNode.addAttribute( ShakeNode.bakedCache )
+	ShakeNode.addAttribute( ShakeNode.octaveSeriesX )
+	ShakeNode.addAttribute( ShakeNode.octaveSeriesY )
+	ShakeNode.addAttribute( ShakeNode.octaveSeriesZ )
+	ShakeNode.addAttribute( ShakeNode.profile )
+	ShakeNode.addAttribute( ShakeNode.computeCount )
+	ShakeNode.addAttribute( ShakeNode.computeTime )
+	ShakeNode.addAttribute( ShakeNode.averageOctaves )
 
 	# when one attribute is changed, it will cause
 	# the other to become "dirty", meaning that its value
-	# should be computed again
-	ShakeNode.attributeAffects( ShakeNode.amp, ShakeNode.output )
-	ShakeNode.attributeAffects( ShakeNode.freq, ShakeNode.output )
-	ShakeNode.attributeAffects( ShakeNode.seed, ShakeNode.output )
-	ShakeNode.attributeAffects( ShakeNode.octaves, ShakeNode.output )
-	ShakeNode.attributeAffects( ShakeNode.time, ShakeNode.output )
-	
+	# should be computed again.
+	# The settings of an axis only affect its own octave series and
+	# output, and the settings shared by all axes affect all three.
+	# The time does not affect the series, so a new frame only dirties
+	# the output, which then just evaluates the noise.
+	# Affects are not chained within a node, so each setting also
+	# affects the output directly, not only through the series.
+	axisAttrs = ((ShakeNode.ampX, ShakeNode.freqX, ShakeNode.enableX),
+				 (ShakeNode.ampY, ShakeNode.freqY, ShakeNode.enableY),
+				 (ShakeNode.ampZ, ShakeNode.freqZ, ShakeNode.enableZ))
+	sharedAttrs = (ShakeNode.seed, ShakeNode.octaves, ShakeNode.noiseType, ShakeNode.tolerance,
+				   ShakeNode.cacheNoise)
+
+	for series, output, attrs in zip(ShakeNode.octaveSeriesAxes, ShakeNode.outputAxes, axisAttrs):
+		for attr in attrs + sharedAttrs:
+			ShakeNode.attributeAffects( attr, series )
+		for attr in attrs + (series,):
+			ShakeNode.attributeAffects( attr, output )
+
+	for attr in sharedAttrs + (ShakeNode.time,):
+		ShakeNode.attributeAffects( attr, ShakeNode.output )
+
+	enableAttrs = (ShakeNode.enable, ShakeNode.enableX, ShakeNode.enableY, ShakeNode.enableZ, 
+				   ShakeNode.tolerance)
+
+	for attr in (ShakeNode.amp, ShakeNode.freq, ShakeNode.seed, ShakeNode.octaves, 
+				 ShakeNode.noiseType, ShakeNode.time) + enableAttrs:
+		ShakeNode.attributeAffects( attr, ShakeNode.outputVelocity )
+
+	# everything but the time changes the baked samples
+	for attr in (ShakeNode.amp, ShakeNode.freq, ShakeNode.seed, ShakeNode.octaves, 
+				 ShakeNode.noiseType, ShakeNode.bakeStart, ShakeNode.bakeEnd) + enableAttrs:
+		ShakeNode.attributeAffects( attr, ShakeNode.bakedCache )
+
+	# The bakedCache does not affect the output, or every setting would
+	# dirty all three axes through it. The output is already dirtied by
+	# every input of the cache, and pulls it when bake is on.
+	for attr in (ShakeNode.bake, ShakeNode.bakeStart, ShakeNode.bakeEnd):
+		ShakeNode.attributeAffects( attr, ShakeNode.output )
+
+
+def arrayNodeInitializer():
+
+	nAttr = OpenMaya.MFnNumericAttribute()
+	uAttr = OpenMaya.MFnUnitAttribute()
+	eAttr = OpenMaya.MFnEnumAttribute()
+	cAttr = OpenMaya.MFnCompoundAttribute()
+
+	# input
+
+	# the settings of each channel, the same as a shakeNode
+	ShakeArrayNode.amp = nAttr.create( "amplitude", "amp", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	ShakeArrayNode.freq = nAttr.create( "frequency", "freq", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	ShakeArrayNode.seed = nAttr.create( "randomSeed", "seed", OpenMaya.MFnNumericData.kLong, 1000 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+	nAttr.setMin(0)
+
+	ShakeArrayNode.channel = cAttr.create( "channel", "ch" )
+	cAttr.addChild(ShakeArrayNode.amp)
+	cAttr.addChild(ShakeArrayNode.freq)
+	cAttr.addChild(ShakeArrayNode.seed)
+	cAttr.setArray(True)
+	cAttr.setStorable(True)
+
+	# shared by all of the channels
+	ShakeArrayNode.octaves = nAttr.create( "octaves", "oct", OpenMaya.MFnNumericData.kInt, 3 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+	nAttr.setMin(2)
+
+	ShakeArrayNode.noiseType = eAttr.create( "noiseType", "nt", 0 )
+	eAttr.addField("Perlin", 0)
+	eAttr.addField("Simplex", 1)
+	eAttr.setStorable(True)
+	eAttr.setKeyable(False)
+
+	ShakeArrayNode.time = uAttr.create( "currentTime", "time" , OpenMaya.MFnUnitAttribute.kTime,  0.0 )
+	uAttr.setHidden(True)
+	uAttr.setStorable(False)
+
+	# output, one element for each channel
+	ShakeArrayNode.output = nAttr.create( "output", "out", OpenMaya.MFnNumericData.k3Float, 0.0 )
+	nAttr.setArray(True)
+	nAttr.setUsesArrayDataBuilder(True)
+	nAttr.setStorable(False)
+	nAttr.setWritable(False)
+	nAttr.setHidden(False)
+
+
+	# the children are added along with the channel compound
+	ShakeArrayNode.addAttribute( ShakeArrayNode.channel )
+	ShakeArrayNode.addAttribute( ShakeArrayNode.time )
+	ShakeArrayNode.addAttribute( ShakeArrayNode.octaves )
+	ShakeArrayNode.addAttribute( ShakeArrayNode.noiseType )
+	ShakeArrayNode.addAttribute( ShakeArrayNode.output )
+
+	for attr in (ShakeArrayNode.channel, ShakeArrayNode.amp, ShakeArrayNode.freq, 
+				 ShakeArrayNode.seed, ShakeArrayNode.octaves, ShakeArrayNode.noiseType, 
+				 ShakeArrayNode.time):
+		ShakeArrayNode.attributeAffects( attr, ShakeArrayNode.output )
+
+
+def sourceNodeInitializer():
+
+	nAttr = OpenMaya.MFnNumericAttribute()
+	eAttr = OpenMaya.MFnEnumAttribute()
+	tAttr = OpenMaya.MFnTypedAttribute()
+
+	# input, the same shake settings as a shakeNode
+
+	ShakeSourceNode.amp = nAttr.create( "amplitude", "amp", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	ShakeSourceNode.freq = nAttr.create( "frequency", "freq", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	ShakeSourceNode.seed = nAttr.create( "randomSeed", "seed", OpenMaya.MFnNumericData.kLong, 1000 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+	nAttr.setMin(0)
+
+	ShakeSourceNode.octaves = nAttr.create( "octaves", "oct", OpenMaya.MFnNumericData.kInt, 3 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+	nAttr.setMin(2)
+
+	ShakeSourceNode.noiseType = eAttr.create( "noiseType", "nt", 0 )
+	eAttr.addField("Perlin", 0)
+	eAttr.addField("Simplex", 1)
+	eAttr.setStorable(True)
+	eAttr.setKeyable(False)
+
+	# The curve loops every loopLength seconds. The frequency of
+	# each octave is rounded to loop seamlessly, which changes it
+	# less the longer the loop is.
+	ShakeSourceNode.loopLength = nAttr.create( "loopLength", "ll", OpenMaya.MFnNumericData.kFloat, 60.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+	nAttr.setMin(0.001)
+
+	# samples of the curve per second, which should be well
+	# above the highest octave frequency
+	ShakeSourceNode.sampleRate = nAttr.create( "sampleRate", "sr", OpenMaya.MFnNumericData.kFloat, 240.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(False)
+	nAttr.setMin(1.0)
+
+	# output
+	ShakeSourceNode.curve = tAttr.create( "curve", "crv", OpenMaya.MFnData.kDoubleArray )
+	tAttr.setStorable(False)
+	tAttr.setWritable(False)
+
+	inputs = (ShakeSourceNode.amp, ShakeSourceNode.freq, ShakeSourceNode.seed, 
+			  ShakeSourceNode.octaves, ShakeSourceNode.noiseType, 
+			  ShakeSourceNode.loopLength, ShakeSourceNode.sampleRate)
+
+	for attr in inputs + (ShakeSourceNode.curve,):
+		ShakeSourceNode.addAttribute( attr )
+
+	for attr in inputs:
+		ShakeSourceNode.attributeAffects( attr, ShakeSourceNode.curve )
+
+
+def followerNodeInitializer():
+
+	nAttr = OpenMaya.MFnNumericAttribute()
+	uAttr = OpenMaya.MFnUnitAttribute()
+	tAttr = OpenMaya.MFnTypedAttribute()
+
+	# input
+
+	# connected from the curve of a shakeSource
+	ShakeFollowerNode.sourceCurve = tAttr.create( "sourceCurve", "src", OpenMaya.MFnData.kDoubleArray )
+	tAttr.setStorable(False)
+
+	ShakeFollowerNode.time = uAttr.create( "currentTime", "time" , OpenMaya.MFnUnitAttribute.kTime,  0.0 )
+	uAttr.setHidden(True)
+	uAttr.setStorable(False)
+
+	# seconds added to the time, to pick a different part of the curve
+	ShakeFollowerNode.timeOffset = nAttr.create( "timeOffset", "to", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	ShakeFollowerNode.scale = nAttr.create( "scale", "sc", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.setStorable(True)
+	nAttr.setKeyable(True)
+
+	# output
+	ShakeFollowerNode.output = nAttr.create( "output", "out", OpenMaya.MFnNumericData.k3Float, 0.0 )
+	nAttr.setStorable(False)
+	nAttr.setWritable(False)
+	nAttr.setHidden(False)
+
+	inputs = (ShakeFollowerNode.sourceCurve, ShakeFollowerNode.time, 
+			  ShakeFollowerNode.timeOffset, ShakeFollowerNode.scale)
+
+	for attr in inputs + (ShakeFollowerNode.output,):
+		ShakeFollowerNode.addAttribute( attr )
+
+	for attr in inputs:
+		ShakeFollowerNode.attributeAffects( attr, ShakeFollowerNode.output )
+
 
 
 # initialize the script plug-in
@@ -245,6 +1586,36 @@ def initializePlugin(mobject):
 	except:
 		sys.stderr.write( "Failed to register node: %s" % kPluginNodeTypeName )
 		raise
+	try:
+		mplugin.registerNode( kArrayNodeTypeName, shakeArrayNodeId, arrayNodeCreator, arrayNodeInitializer )
+	except:
+		sys.stderr.write( "Failed to register node: %s" % kArrayNodeTypeName )
+		raise
+	try:
+		mplugin.registerNode( kSourceNodeTypeName, shakeSourceId, sourceNodeCreator, sourceNodeInitializer )
+	except:
+		sys.stderr.write( "Failed to register node: %s" % kSourceNodeTypeName )
+		raise
+	try:
+		mplugin.registerNode( kFollowerNodeTypeName, shakeFollowerId, followerNodeCreator, followerNodeInitializer )
+	except:
+		sys.stderr.write( "Failed to register node: %s" % kFollowerNodeTypeName )
+		raise
+	try:
+		mplugin.registerCommand( kCreateCmdName, createCmdCreator, createCmdSyntaxCreator )
+	except:
+		sys.stderr.write( "Failed to register command: %s" % kCreateCmdName )
+		raise
+	try:
+		mplugin.registerCommand( kFollowersCmdName, followersCmdCreator, followersCmdSyntaxCreator )
+	except:
+		sys.stderr.write( "Failed to register command: %s" % kFollowersCmdName )
+		raise
+	try:
+		mplugin.registerCommand( kBakeCmdName, bakeCmdCreator, bakeCmdSyntaxCreator )
+	except:
+		sys.stderr.write( "Failed to register command: %s" % kBakeCmdName )
+		raise
 
 # uninitialize the script plug-in
 def uninitializePlugin(mobject):
@@ -254,4 +1625,34 @@ def uninitializePlugin(mobject):
 	except:
 		sys.stderr.write( "Failed to deregister node: %s" % kPluginNodeTypeName )
 		raise
+	try:
+		mplugin.deregisterNode( shakeArrayNodeId )
+	except:
+		sys.stderr.write( "Failed to deregister node: %s" % kArrayNodeTypeName )
+		raise
+	try:
+		mplugin.deregisterNode( shakeSourceId )
+	except:
+		sys.stderr.write( "Failed to deregister node: %s" % kSourceNodeTypeName )
+		raise
+	try:
+		mplugin.deregisterNode( shakeFollowerId )
+	except:
+		sys.stderr.write( "Failed to deregister node: %s" % kFollowerNodeTypeName )
+		raise
+	try:
+		mplugin.deregisterCommand( kCreateCmdName )
+	except:
+		sys.stderr.write( "Failed to deregister command: %s" % kCreateCmdName )
+		raise
+	try:
+		mplugin.deregisterCommand( kFollowersCmdName )
+	except:
+		sys.stderr.write( "Failed to deregister command: %s" % kFollowersCmdName )
+		raise
+	try:
+		mplugin.deregisterCommand( kBakeCmdName )
+	except:
+		sys.stderr.write( "Failed to deregister command: %s" % kBakeCmdName )
+		raise
 	
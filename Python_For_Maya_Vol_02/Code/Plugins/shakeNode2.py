@@ -0,0 +1,228 @@
+"""
+shakeNode2.py
+
+The shakeNode plugin ported to the Maya Python API 2.0
+(maya.api.OpenMaya). It registers a shakeNode2 node with the
+same shake attributes as shakeNode: amplitude, frequency, seed,
+octaves, noiseType, enable and octaveTolerance. It produces the
+same output for the same settings.
+
+The noise comes from noisekernel.py, which calls the compiled
+noisekernel.c when it has been built, and falls back to the pure
+python pnoise.py otherwise. Both give identical results.
+noiseBackend() tells which one is in use, and
+noise_benchmark.py --backends compares their compute latency.
+
+The bake, profiling and outputVelocity features of shakeNode
+are not part of this port.
+
+Uses pnoise.py and noisekernel.py, which should be found on the
+python path, like for shakeNode.py.
+
+PYTHON usage:
+	import maya.cmds as cmds
+	cmds.loadPlugin("/path/to/shakeNode2.py")
+	shake = cmds.createNode("shakeNode2")
+	cmds.connectAttr("time1.outTime", "%s.time" % shake)
+
+"""
+
+import sys
+
+from pnoise import get_generator, BASES, PERLIN
+import noisekernel
+
+import maya.api.OpenMaya as OpenMaya
+
+
+# Tells Maya that this plugin uses the API 2.0
+def maya_useNewAPI():
+	pass
+
+
+kPluginNodeTypeName = "shakeNode2"
+
+# The next id after shakeNode (0x90000) and shakeArrayNode (0x90001)
+shakeNode2Id = OpenMaya.MTypeId(0x90002)
+
+
+class ShakeNode2(OpenMaya.MPxNode):
+
+	# input attributes
+	amp 	= OpenMaya.MObject()
+	freq 	= OpenMaya.MObject()
+	seed 	= OpenMaya.MObject()
+	time 	= OpenMaya.MObject()
+	octaves = OpenMaya.MObject()
+	noiseType = OpenMaya.MObject()
+	enable 	= OpenMaya.MObject()
+	enableX = OpenMaya.MObject()
+	enableY = OpenMaya.MObject()
+	enableZ = OpenMaya.MObject()
+	tolerance = OpenMaya.MObject()
+
+	# output attributes
+	output 	= OpenMaya.MObject()
+
+
+	def __init__(self):
+		super(ShakeNode2, self).__init__()
+
+		# The pnoise generator of each axis, and the node seed
+		# they were made for. The kernel reads their gradient tables.
+		self._generators = [None, None, None]
+		self._seed = None
+
+
+	# Safe to compute in parallel, like shakeNode
+	def schedulingType(self):
+		return OpenMaya.MPxNode.kParallel
+
+
+	def compute(self, plug, dataBlock):
+
+		# the output, or one of its x, y, z children
+		if plug.isChild:
+			plug = plug.parent()
+
+		if plug.attribute() != ShakeNode2.output:
+			return None
+
+		amp 	= list(dataBlock.inputValue(ShakeNode2.amp).asFloat3())
+		freq 	= dataBlock.inputValue(ShakeNode2.freq).asFloat3()
+		mTime	= dataBlock.inputValue(ShakeNode2.time).asTime()
+		octaves	= dataBlock.inputValue(ShakeNode2.octaves).asInt()
+		seed 	= dataBlock.inputValue(ShakeNode2.seed).asInt()
+		secs	= mTime.asUnits(OpenMaya.MTime.kSeconds)
+		basis 	= BASES[dataBlock.inputValue(ShakeNode2.noiseType).asShort()]
+		tol 	= dataBlock.inputValue(ShakeNode2.tolerance).asFloat()
+
+		# a disabled axis has no amplitude
+		enable = dataBlock.inputValue(ShakeNode2.enable)
+		for i, attr in enumerate((ShakeNode2.enableX, ShakeNode2.enableY, ShakeNode2.enableZ)):
+			if not enable.child(attr).asBool():
+				amp[i] = 0
+
+		# all three axes in one noisekernel call
+		out = noisekernel.fbm3(self.getGenerators(seed), secs, freq, amp, octaves,
+							   basis=basis, tolerance=tol)
+
+		outputHandle = dataBlock.outputValue(ShakeNode2.output)
+		outputHandle.set3Float(out[0], out[1], out[2])
+		dataBlock.setClean(plug)
+
+
+	def getGenerators(self, seed):
+		"""
+		getGenerators (int seed) -> list generators
+
+			The noise generator of each axis for seed. Each axis gets
+			its own seed, like in ShakeNode, to make sure that the
+			curves are not identical. They are looked up again only
+			when the seed changes.
+		"""
+
+		if seed != self._seed:
+			self._generators = [get_generator(seed * 3 + axis) for axis in range(3)]
+			self._seed = seed
+
+		return self._generators
+
+
+def noiseBackend():
+	"""
+	noiseBackend () -> string backend
+
+		The noisekernel backend that computes the noise,
+		noisekernel.KERNEL or noisekernel.PYTHON
+	"""
+	return noisekernel.BACKEND
+
+
+def nodeCreator():
+	return ShakeNode2()
+
+
+def nodeInitializer():
+
+	nAttr = OpenMaya.MFnNumericAttribute()
+	uAttr = OpenMaya.MFnUnitAttribute()
+	eAttr = OpenMaya.MFnEnumAttribute()
+
+	# input
+
+	ShakeNode2.amp = nAttr.create( "amplitude", "amp", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.storable = True
+	nAttr.keyable = True
+
+	ShakeNode2.freq = nAttr.create( "frequency", "freq", OpenMaya.MFnNumericData.k3Float, 1.0 )
+	nAttr.storable = True
+	nAttr.keyable = True
+
+	ShakeNode2.seed = nAttr.create( "randomSeed", "seed", OpenMaya.MFnNumericData.kLong, 1000 )
+	nAttr.storable = True
+	nAttr.keyable = False
+	nAttr.setMin(0)
+
+	ShakeNode2.octaves = nAttr.create( "octaves", "oct", OpenMaya.MFnNumericData.kInt, 3 )
+	nAttr.storable = True
+	nAttr.keyable = True
+	nAttr.setMin(2)
+
+	# the fields must be in the same order as pnoise.BASES
+	ShakeNode2.noiseType = eAttr.create( "noiseType", "nt", 0 )
+	eAttr.addField("Perlin", 0)
+	eAttr.addField("Simplex", 1)
+	eAttr.storable = True
+	eAttr.keyable = False
+
+	ShakeNode2.enableX = nAttr.create( "enableX", "enx", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode2.enableY = nAttr.create( "enableY", "eny", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode2.enableZ = nAttr.create( "enableZ", "enz", OpenMaya.MFnNumericData.kBoolean, True )
+	ShakeNode2.enable = nAttr.create( "enable", "en", ShakeNode2.enableX, ShakeNode2.enableY, ShakeNode2.enableZ )
+	nAttr.storable = True
+	nAttr.keyable = True
+
+	ShakeNode2.tolerance = nAttr.create( "octaveTolerance", "otol", OpenMaya.MFnNumericData.kFloat, 0.0 )
+	nAttr.storable = True
+	nAttr.keyable = False
+	nAttr.setMin(0.0)
+
+	ShakeNode2.time = uAttr.create( "currentTime", "time" , OpenMaya.MFnUnitAttribute.kTime,  0.0 )
+	uAttr.hidden = True
+	uAttr.storable = False
+
+	# output
+	ShakeNode2.output = nAttr.create( "output", "out", OpenMaya.MFnNumericData.k3Float, 0.0 )
+	nAttr.storable = False
+	nAttr.writable = False
+	nAttr.hidden = False
+
+
+	for attr in (ShakeNode2.amp, ShakeNode2.freq, ShakeNode2.seed, ShakeNode2.octaves,
+				 ShakeNode2.noiseType, ShakeNode2.enable, ShakeNode2.tolerance,
+				 ShakeNode2.time, ShakeNode2.output):
+		OpenMaya.MPxNode.addAttribute( attr )
+
+	for attr in (ShakeNode2.amp, ShakeNode2.freq, ShakeNode2.seed, ShakeNode2.octaves,
+				 ShakeNode2.noiseType, ShakeNode2.enable, ShakeNode2.enableX,
+				 ShakeNode2.enableY, ShakeNode2.enableZ, ShakeNode2.tolerance, ShakeNode2.time):
+		OpenMaya.MPxNode.attributeAffects( attr, ShakeNode2.output )
+
+
+def initializePlugin(mobject):
+	mplugin = OpenMaya.MFnPlugin(mobject, "Justin Israel", "1.0", "Any")
+	try:
+		mplugin.registerNode( kPluginNodeTypeName, shakeNode2Id, nodeCreator, nodeInitializer )
+	except:
+		sys.stderr.write( "Failed to register node: %s" % kPluginNodeTypeName )
+		raise
+
+
+def uninitializePlugin(mobject):
+	mplugin = OpenMaya.MFnPlugin(mobject)
+	try:
+		mplugin.deregisterNode( shakeNode2Id )
+	except:
+		sys.stderr.write( "Failed to deregister node: %s" % kPluginNodeTypeName )
+		raise
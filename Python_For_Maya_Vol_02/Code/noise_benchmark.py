@@ -0,0 +1,652 @@
+"""
+Noise benchmark and regression suite:
+    scalar vs batch (numpy) vs seeded generator noise
+
+    pnoise.py is pure python and does not need Maya,
+    so this can be run from any python interpreter:
+
+        python noise_benchmark.py
+        python noise_benchmark.py --json results.json
+        python noise_benchmark.py --baseline results.json --threshold 0.2
+        python noise_benchmark.py --memory --max-size 100000000
+        python noise_benchmark.py --grad
+        python noise_benchmark.py --backends
+
+    1. Evaluate each noise function for input sizes of 1, 10, 100...
+       up to --max-size (10^6 by default, 10^7 needs a few GB of RAM).
+       The scalar functions stop at --max-scalar-size, since their
+       throughput does not change with the number of samples.
+    2. Report the samples per second for each function and size
+    3. Optionally write the results as JSON, and compare them against
+       a previous JSON run. Any result slower than the baseline by more
+       than the threshold is a regression, and the exit code is 1.
+       Sizes below --gate-size are reported, but never fail the run,
+       since timing a handful of samples is dominated by call overhead
+       and too noisy to compare. Each regression is timed again up to
+       RECHECKS times, and only fails the run if it is still slower,
+       so that a burst of load on the machine is not a regression.
+
+       A fixed calibration loop is timed right before every timing
+       of a case, and the gate compares the rates in units of that 
+       loop (the samples evaluated in the time of one calibration 
+       loop). When the whole machine runs slower or faster, the case
+       and the calibration both change and the ratio does not, so a
+       baseline from a quiet machine still gates a run on a busy one.
+
+    --backends instead compares the latency of a single shakeNode
+    compute() (3 axes of fbm) with each noise backend: pnoise, the
+    pnoise sampler that shakeNode uses, the same sampler with its 
+    cache on (every frame is a hit after the first timing, as when
+    scrubbing), and the compiled kernel of noisekernel.py, if it 
+    has been built, called once per axis and once for all three
+    axes (noisekernel.fbm3(), which shakeNode2 uses).
+
+    The generator.fbm_cached case is generator.fbm with the cache
+    on. The same samples are evaluated on every timing, so it 
+    measures cache hits against generator.fbm recomputing them.
+
+    The *_f32 cases compute in float32 (dtype=numpy.float32), to compare
+    against the float64 batch cases. --memory also reports the peak
+    memory per sample of the batch cases, which is where float32 helps
+    the most at 10^6 to 10^8 samples.
+"""
+
+
+import os
+import sys
+import json
+import random
+import platform
+import argparse
+import timeit
+import tracemalloc
+
+# pnoise.py lives with the plugins
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "Plugins", "python"))
+
+import pnoise
+import noisekernel
+
+numpy = pnoise.numpy
+
+
+# number of samples to evaluate in the grad() test
+SAMPLES = 200000
+
+# each timing repeats the test until it has run for at least
+# this many seconds, and the median of REPEAT timings is used
+MIN_TIME = 0.2
+REPEAT   = 5
+
+# the smallest number of samples that the regression gate compares
+GATE_SIZE = 100
+
+# how many times a regression is timed again before it fails the run
+RECHECKS = 3
+
+# the calibration loop is timed for at least this many seconds,
+# before each of the REPEAT timings of a case
+CALIBRATION_TIME = 0.02
+
+# settings for the fbm tests
+FBM_OCTAVES = 6
+
+# seed for the seeded generator tests
+GENERATOR_SEED = 1234
+
+RAND    = random.Random(0)
+
+
+def branchGrad(h, x, y, z):
+    """
+    The original grad() from the Perlin reference implementation,
+    kept here to compare against.
+    """
+    h = h & 15
+    if h < 8:
+        u = x
+    else:
+        u = y
+    if h < 4:
+        v = y
+    elif h == 12 or h == 14:
+        v = x
+    else:
+        v = z
+    if h & 1 != 0:
+        u = -u
+    if h & 2 != 0:
+        v = -v
+    return u + v
+
+
+def makeSamples(size=SAMPLES):
+    samples = []
+    for _ in range(size):
+        samples.append((RAND.randint(0, 255),
+                        RAND.uniform(-1, 1),
+                        RAND.uniform(-1, 1),
+                        RAND.uniform(-1, 1)))
+    return samples
+
+
+def timeGrad(func, samples):
+
+    start = timeit.default_timer()
+
+    for h, x, y, z in samples:
+        func(h, x, y, z)
+
+    end = timeit.default_timer()
+    return end-start
+
+
+def timeGradArray(samples):
+
+    h, x, y, z = zip(*samples)
+    h = numpy.array(h)
+    x = numpy.array(x)
+    y = numpy.array(y)
+    z = numpy.array(z)
+
+    start = timeit.default_timer()
+
+    pnoise._grad_array(h, x, y, z)
+
+    end = timeit.default_timer()
+    return end-start
+
+
+def testGrad(size=SAMPLES):
+
+    samples = makeSamples(size)
+
+    # make sure we are comparing equal results
+    for h, x, y, z in samples[:1000]:
+        assert branchGrad(h, x, y, z) == pnoise.grad(h, x, y, z)
+
+    results = []
+
+    sys.stdout.write("Testing branchGrad()\n")
+    sys.stdout.flush()
+    results.append((timeGrad(branchGrad, samples), "branch grad"))
+
+    sys.stdout.write("Testing pnoise.grad()\n")
+    sys.stdout.flush()
+    results.append((timeGrad(pnoise.grad, samples), "table grad"))
+
+    if numpy is not None:
+        sys.stdout.write("Testing pnoise._grad_array()\n")
+        sys.stdout.flush()
+        results.append((timeGradArray(samples), "table grad (numpy)"))
+
+    results.sort()
+    slowest = results[-1]
+    perMillion = 1000000.0 / size
+
+    sys.stdout.write("\nResults per million samples, from fastest to slowest...\n")
+    for r in results:
+        diff = slowest[0] / r[0]
+        sys.stdout.write("%s:\t%0.4f sec (%0.2fx faster than %s)\n" %
+                         (r[1], r[0] * perMillion, diff, slowest[1]))
+
+
+def testBackends(frames=1000, octaves=3):
+    """
+    testBackends (int frames=1000, int octaves=3)
+
+        Time a stand-in shakeNode compute() over consecutive frames
+        with each noise backend, after checking that they agree
+    """
+    gens = [pnoise.NoiseGenerator(GENERATOR_SEED * 3 + axis) for axis in range(3)]
+    amp  = (1.0, 0.5, 0.25)
+    freq = (1.0, 2.0, 3.0)
+    times = [i / 24.0 for i in range(frames)]
+
+    samplers = [gen.sampler(f, a, octaves) for gen, f, a in zip(gens, freq, amp)]
+
+    # separate generators, so the cache does not affect the others
+    cachedGens = [pnoise.NoiseGenerator(GENERATOR_SEED * 3 + axis) for axis in range(3)]
+    cachedSamplers = [gen.sampler(f, a, octaves, cache=True) 
+                      for gen, f, a in zip(cachedGens, freq, amp)]
+
+    def computePython(t):
+        return [gen.fbm(t, f, a, octaves) for gen, f, a in zip(gens, freq, amp)]
+
+    def computeSampler(t):
+        return [sampler.sample(t) for sampler in samplers]
+
+    def computeCached(t):
+        return [sampler.sample(t) for sampler in cachedSamplers]
+
+    def computeKernel(t):
+        return [noisekernel.fbm(gen, t, f, a, octaves) for gen, f, a in zip(gens, freq, amp)]
+
+    def computeKernel3(t):
+        return noisekernel.fbm3(gens, t, freq, amp, octaves)
+
+    backends = [("pnoise fbm", computePython), ("pnoise sampler", computeSampler),
+                ("sampler cached", computeCached)]
+    if noisekernel.BACKEND == noisekernel.KERNEL:
+        backends.append(("noisekernel", computeKernel))
+        backends.append(("noisekernel fbm3", computeKernel3))
+    else:
+        sys.stdout.write("noisekernel is not built, see noisekernel.build()\n")
+
+    expected = [computePython(t) for t in times]
+    for name, compute in backends:
+        assert [compute(t) for t in times] == expected, "%s does not match pnoise" % name
+
+    # the batch kernel keeps the shape of its input, down to a single time
+    if numpy is not None:
+        t = times[7]
+        for batch in (t, numpy.float64(t), numpy.array(t), numpy.array(times).reshape(-1, 10)):
+            for gen, f, a in zip(gens, freq, amp):
+                out = noisekernel.fbm_array(gen, batch, f, a, octaves)
+                assert out.shape == numpy.shape(batch), "fbm_array() changed the shape"
+                assert (out == gen.fbm(numpy.asarray(batch), f, a, octaves)).all(), \
+                    "fbm_array() does not match pnoise"
+
+    sys.stdout.write("Latency per compute() of %d octaves, over %d frames...\n" % (octaves, frames))
+    slowest = None
+    for name, compute in backends:
+        seconds = timeCase(lambda: [compute(t) for t in times]) / frames
+        slowest = slowest or seconds
+        sys.stdout.write("%-16s %8.2f usec (%0.2fx)\n" % (name, seconds * 1e6, slowest / seconds))
+
+
+#
+# Benchmark cases.
+# Each one takes a list of x coordinates (and the numpy array
+# version of it, for the batch cases), and returns a function
+# that evaluates every sample once.
+#
+
+def scalarCase(func):
+    def setup(xs, arr):
+        def run():
+            for x in xs:
+                func(x, 0.5, 0.25)
+        return run
+    return setup
+
+
+def scalar1Case(func):
+    def setup(xs, arr):
+        def run():
+            for x in xs:
+                func(x)
+        return run
+    return setup
+
+
+def scalarFbmCase(gen):
+    def setup(xs, arr):
+        def run():
+            for x in xs:
+                gen.fbm(x, 1.0, 1.0, FBM_OCTAVES)
+        return run
+    return setup
+
+
+def cachedFbmCase(seed):
+    def setup(xs, arr):
+        gen = pnoise.NoiseGenerator(seed)
+        gen.enable_cache(max(len(xs), 1))
+        return scalarFbmCase(gen)(xs, arr)
+    return setup
+
+
+def arrayCase(func, dtype=None):
+    def setup(xs, arr):
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        y = arr * 0.5
+        z = arr * 0.25
+        return lambda: func(arr, y, z, dtype=dtype)
+    return setup
+
+
+def array1Case(func, dtype=None):
+    def setup(xs, arr):
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return lambda: func(arr, dtype=dtype)
+    return setup
+
+
+def arrayFbmCase(gen, dtype=None):
+    def setup(xs, arr):
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return lambda: gen.fbm(arr, 1.0, 1.0, FBM_OCTAVES, dtype=dtype)
+    return setup
+
+
+def getCases():
+    """
+    getCases() -> (list scalarCases, list batchCases)
+
+        Each case is a (name, setup) tuple
+    """
+    gen = pnoise.NoiseGenerator(GENERATOR_SEED)
+    default = pnoise._defaultGenerator
+
+    scalar = [
+        ("pnoise",              scalarCase(pnoise.pnoise)),
+        ("pnoise1",             scalar1Case(pnoise.pnoise1)),
+        ("snoise",              scalarCase(pnoise.snoise)),
+        ("fbm",                 scalarFbmCase(default)),
+        ("generator.perlin",    scalarCase(gen.perlin)),
+        ("generator.fbm",       scalarFbmCase(gen)),
+        ("generator.fbm_cached", cachedFbmCase(GENERATOR_SEED)),
+    ]
+
+    batch = []
+    if numpy is not None:
+        batch = [
+            ("pnoise_array",            arrayCase(pnoise.pnoise_array)),
+            ("pnoise1_array",           array1Case(pnoise.pnoise1_array)),
+            ("snoise_array",            arrayCase(pnoise.snoise_array)),
+            ("fbm_array",               arrayFbmCase(default)),
+            ("generator.perlin_array",  arrayCase(gen.perlin_array)),
+            ("generator.fbm_array",     arrayFbmCase(gen)),
+            ("pnoise_array_f32",        arrayCase(pnoise.pnoise_array, numpy.float32)),
+            ("pnoise1_array_f32",       array1Case(pnoise.pnoise1_array, numpy.float32)),
+            ("snoise_array_f32",        arrayCase(pnoise.snoise_array, numpy.float32)),
+            ("fbm_array_f32",           arrayFbmCase(default, numpy.float32)),
+        ]
+
+    return scalar, batch
+
+
+def timeCase(run):
+    """
+    timeCase (function run) -> float seconds
+
+        The median time of a single call to run(), repeating
+        it enough to get a stable measurement
+    """
+    number = 1
+    while True:
+        elapsed = timeit.timeit(run, number=number)
+        if elapsed >= MIN_TIME:
+            break
+        number *= 2
+
+    timings = [elapsed] + [timeit.timeit(run, number=number) for _ in range(REPEAT - 1)]
+    timings.sort()
+
+    return timings[len(timings) // 2] / number
+
+
+def calibrationLoop():
+    """
+    A fixed amount of interpreter and numpy work, unrelated to 
+    pnoise, to measure how fast the machine is running right now
+    """
+    x = 0.0
+    for i in range(2000):
+        x += (i & 15) * 0.5 - x * 0.25
+    if numpy is not None:
+        a = numpy.arange(2000.0)
+        numpy.floor(a * 0.37 + x).astype(numpy.int64) & 255
+    return x
+
+
+def timeCalibrated(run):
+    """
+    timeCalibrated (function run) -> (float seconds, float loops)
+
+        timeCase(), along with the median time of a single call to run()
+        in calibration loops. Each timing of run() is divided by a timing
+        of calibrationLoop() taken just before it, so that the machine 
+        getting slower or faster during the run cancels out.
+    """
+    def repeats(func, minTime):
+        number = 1
+        while timeit.timeit(func, number=number) < minTime:
+            number *= 2
+        return number
+
+    number = repeats(run, MIN_TIME)
+    calNumber = repeats(calibrationLoop, CALIBRATION_TIME)
+
+    timings = []
+    ratios = []
+    for _ in range(REPEAT):
+        calibration = timeit.timeit(calibrationLoop, number=calNumber) / calNumber
+        seconds = timeit.timeit(run, number=number) / number
+        timings.append(seconds)
+        ratios.append(seconds / calibration)
+
+    timings.sort()
+    ratios.sort()
+    return timings[len(timings) // 2], ratios[len(ratios) // 2]
+
+
+def peakMemory(run):
+    """
+    peakMemory (function run) -> int bytes
+
+        The peak memory allocated during a single call to run(),
+        as seen by tracemalloc (which numpy reports its arrays to)
+    """
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def getSizes(maxSize):
+    sizes = []
+    size = 1
+    while size <= maxSize:
+        sizes.append(size)
+        size *= 10
+    return sizes
+
+
+def runSuite(maxSize=10**6, maxScalarSize=10**5, names=None, memory=None, calibrated=None):
+    """
+    runSuite (int maxSize=10**6, int maxScalarSize=10**5, list names=None,
+              dict memory=None, dict calibrated=None) -> dict results
+
+        Run every benchmark case, or only the ones in names, and return
+        the samples per second as {case name: {str size: float rate}}
+
+        If a memory dict is given, it is filled with the peak bytes
+        per sample of the batch cases, in the same layout.
+
+        If a calibrated dict is given, it is filled with the samples
+        per calibration loop of every case, in the same layout. 
+        See timeCalibrated()
+    """
+    scalar, batch = getCases()
+    results = {}
+
+    for cases, limit in ((scalar, maxScalarSize), (batch, maxSize)):
+        for size in getSizes(min(limit, maxSize)):
+
+            xs  = [RAND.uniform(-256, 256) for _ in range(size)]
+            arr = numpy.array(xs) if numpy is not None else None
+
+            for name, setup in cases:
+                if names and name not in names:
+                    continue
+
+                run = setup(xs, arr)
+                if calibrated is None:
+                    seconds = timeCase(run)
+                else:
+                    seconds, loops = timeCalibrated(run)
+                rate = size / seconds
+                results.setdefault(name, {})[str(size)] = rate
+
+                sys.stdout.write("%-24s %10d samples:\t%14.0f samples/sec" % (name, size, rate))
+
+                if calibrated is not None:
+                    calibrated.setdefault(name, {})[str(size)] = size / loops
+                    sys.stdout.write("\t%10.2f samples/loop" % (size / loops))
+
+                if memory is not None and cases is batch:
+                    perSample = peakMemory(run) / float(size)
+                    memory.setdefault(name, {})[str(size)] = perSample
+                    sys.stdout.write("\t%10.1f bytes/sample" % perSample)
+
+                sys.stdout.write("\n")
+                sys.stdout.flush()
+
+    return results
+
+
+def compareResults(results, baseline, threshold, minSize=GATE_SIZE):
+    """
+    compareResults (dict results, dict baseline, float threshold, 
+                    int minSize=GATE_SIZE) -> list regressions
+
+        Compare the rate of each case and size that is in both 
+        results and baseline, from minSize samples up. The rates may
+        be samples per second, or samples per calibration loop.
+        A result that is more than threshold (a fraction, ie 0.2 == 20%)
+        slower than the baseline is returned as a 
+        (name, size, rate, baselineRate) regression.
+    """
+    regressions = []
+
+    for name in sorted(results):
+        for size, rate in sorted(results[name].items(), key=lambda item: int(item[0])):
+
+            if int(size) < minSize:
+                continue
+
+            baseRate = baseline.get(name, {}).get(size)
+            if not baseRate:
+                continue
+
+            if rate < baseRate * (1.0 - threshold):
+                regressions.append((name, int(size), rate, baseRate))
+
+    return regressions
+
+
+def recheckRegressions(regressions, threshold, rechecks=RECHECKS, calibrated=True):
+    """
+    recheckRegressions (list regressions, float threshold, int rechecks=RECHECKS,
+                        bool calibrated=True) -> list regressions
+
+        Time each regression from compareResults() again, up to rechecks
+        times, and return the ones that are still more than threshold
+        slower than the baseline, with the best rate that was measured.
+        The rates are samples per calibration loop if calibrated is True,
+        and samples per second otherwise.
+    """
+    scalar, batch = getCases()
+    cases = dict(scalar + batch)
+
+    confirmed = []
+    for name, size, rate, baseRate in regressions:
+        for _ in range(rechecks):
+            if rate >= baseRate * (1.0 - threshold):
+                break
+
+            xs  = [RAND.uniform(-256, 256) for _ in range(size)]
+            arr = numpy.array(xs) if numpy is not None else None
+            run = cases[name](xs, arr)
+            if calibrated:
+                rate = max(rate, size / timeCalibrated(run)[1])
+            else:
+                rate = max(rate, size / timeCase(run))
+
+        if rate < baseRate * (1.0 - threshold):
+            confirmed.append((name, size, rate, baseRate))
+
+    return confirmed
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="pnoise.py benchmark and regression suite")
+    parser.add_argument("--max-size", type=int, default=10**6,
+        help="largest number of samples for the batch cases (default: %(default)s)")
+    parser.add_argument("--max-scalar-size", type=int, default=10**5,
+        help="largest number of samples for the scalar cases (default: %(default)s)")
+    parser.add_argument("--case", action="append", dest="cases",
+        help="only run this case. May be given more than once.")
+    parser.add_argument("--json",
+        help="write the results to this JSON file")
+    parser.add_argument("--baseline",
+        help="JSON file from a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+        help="allowed slowdown versus the baseline, as a fraction (default: %(default)s)")
+    parser.add_argument("--gate-size", type=int, default=GATE_SIZE,
+        help="smallest number of samples compared against the baseline (default: %(default)s)")
+    parser.add_argument("--memory", action="store_true",
+        help="also measure the peak memory per sample of the batch cases")
+    parser.add_argument("--grad", action="store_true",
+        help="run the grad() micro-benchmark instead")
+    parser.add_argument("--backends", action="store_true",
+        help="compare the compute() latency of the noise backends instead")
+
+    opts = parser.parse_args(argv)
+
+    if opts.grad:
+        testGrad()
+        return 0
+
+    if opts.backends:
+        testBackends()
+        return 0
+
+    memory = {} if opts.memory else None
+    calibrated = {}
+    results = runSuite(opts.max_size, opts.max_scalar_size, opts.cases, memory, calibrated)
+
+    if opts.json:
+        data = {
+            "python":   platform.python_version(),
+            "numpy":    numpy.__version__ if numpy is not None else None,
+            "platform": platform.platform(),
+            "results":  results,
+            "calibrated": calibrated,
+        }
+        if memory is not None:
+            data["memory"] = memory
+        with open(opts.json, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    if not opts.baseline:
+        return 0
+
+    with open(opts.baseline) as f:
+        baseline = json.load(f)
+
+    # baselines from before the calibration loop only have samples/sec
+    if "calibrated" in baseline:
+        units = "samples/loop"
+        regressions = compareResults(calibrated, baseline["calibrated"], 
+                                     opts.threshold, opts.gate_size)
+        regressions = recheckRegressions(regressions, opts.threshold)
+    else:
+        units = "samples/sec"
+        regressions = compareResults(results, baseline["results"], 
+                                     opts.threshold, opts.gate_size)
+        regressions = recheckRegressions(regressions, opts.threshold, calibrated=False)
+
+    if not regressions:
+        sys.stdout.write("\nNo regressions against %s\n" % opts.baseline)
+        return 0
+
+    sys.stdout.write("\nRegressions of more than %d%% against %s...\n" %
+                     (opts.threshold * 100, opts.baseline))
+    for name, size, rate, baseRate in regressions:
+        sys.stdout.write("%-24s %10d samples:\t%14.2f %s (baseline %0.2f, %0.2fx)\n" %
+                         (name, size, rate, units, baseRate, rate / baseRate))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Noise thread safety stress test:
+    many shakes evaluated concurrently, checked against serial results
+
+    shakeNode declares itself safe for Maya's parallel evaluation
+    manager. This runs the same pnoise calls that its compute()
+    makes, from a stand-in scheduler that evaluates every node of
+    a frame at the same time on a pool of threads, and checks that
+    every output is identical to evaluating it alone.
+    It does not need Maya:
+
+        python noise_stress.py
+        python noise_stress.py --nodes 500 --frames 200 --threads 16
+
+    To shake out races, the nodes share a small number of seeds.
+    Half of them use samplers from get_generator(), whose cache is
+    shrunk so that generators are dropped and rebuilt all the time.
+    Like shakeNode, they rebuild the sampler of an axis when its octave
+    series is dirty, and otherwise only sample it. The nodes keep 
+    changing their settings, so the samplers are rebuilt during the 
+    parallel evaluation too. The other half share generators that have
+    their scalar cache turned on, small enough to keep evicting.
+"""
+
+
+import os
+import sys
+import random
+import argparse
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# pnoise.py lives with the plugins
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "Plugins", "python"))
+
+import pnoise
+
+
+# frames per second of the stand-in scene
+FPS = 24.0
+
+# size of get_generator()'s cache during the test,
+# much smaller than the number of seeds in use
+GENERATOR_CACHE_SIZE = 8
+
+# size of the scalar cache of the shared generators
+NOISE_CACHE_SIZE = 64
+
+# the nodes pick their seeds from this many,
+# so that most seeds are used by many nodes
+SEEDS = 16
+
+
+class StandInShakeNode(object):
+    """
+    The parts of ShakeNode.compute() that touch pnoise. setOctaves()
+    stands in for the dirty propagation of the DG: changing a setting
+    dirties the octave series of every axis, and compute() then 
+    rebuilds their samplers like ShakeNode.computeOctaveSeries(), 
+    before sampling them like ShakeNode.sampleAxis()
+    """
+
+    def __init__(self, rand, shared):
+        self.seed    = rand.randrange(SEEDS)
+        self.amp     = [rand.uniform(0, 2) for _ in range(3)]
+        self.freq    = [rand.uniform(0.1, 4) for _ in range(3)]
+        self.basis   = rand.choice(pnoise.BASES)
+        self.tol     = rand.choice((0, 0.01))
+        self.sampled = rand.random() < 0.5
+
+        self._shared = shared
+        self._octaves = None
+        self._samplers = [None, None, None]
+        self._series = [None, None, None]
+        self._seriesDirty = [True, True, True]
+
+        # generators that only this node uses, for the reference
+        self._private = [pnoise.NoiseGenerator(self.seed * 3 + axis) for axis in range(3)]
+
+
+    def octavesAt(self, frame):
+        # the settings keep changing, as if they were animated
+        return 2 + frame % 4
+
+
+    def setOctaves(self, octaves):
+        # like setting the octaves attribute, which
+        # dirties the octave series of every axis
+        if octaves != self._octaves:
+            self._octaves = octaves
+            self._seriesDirty = [True, True, True]
+
+
+    def computeOctaveSeries(self, axis):
+        seed = self.seed * 3 + axis
+        sampler = pnoise.get_generator(seed).sampler(
+            self.freq[axis], self.amp[axis], self._octaves, basis=self.basis, tolerance=self.tol)
+        self._samplers[axis] = sampler
+        self._series[axis] = sampler.octave_series()
+        self._seriesDirty[axis] = False
+
+
+    def sampleAxis(self, axis, t):
+        # pulling the octave series only computes it when it is dirty
+        if self._seriesDirty[axis]:
+            self.computeOctaveSeries(axis)
+        return self._samplers[axis].sample(t)
+
+
+    def compute(self, frame):
+        t = frame / FPS
+
+        out = []
+        for axis in range(3):
+            if self.sampled:
+                out.append(self.sampleAxis(axis, t))
+            else:
+                out.append(self._shared[self.seed * 3 + axis].fbm(
+                    t, self.freq[axis], self.amp[axis], self._octaves, 
+                    basis=self.basis, tolerance=self.tol))
+
+        return tuple(out)
+
+
+    def reference(self, frame):
+        """
+        The same output from private generators, with
+        nothing shared with the other nodes
+        """
+        t = frame / FPS
+        octaves = self.octavesAt(frame)
+        return tuple(self._private[axis].fbm(
+                        t, self.freq[axis], self.amp[axis], octaves, basis=self.basis, tolerance=self.tol)
+                     for axis in range(3))
+
+
+class StandInScheduler(object):
+    """
+    Evaluates every node of a frame on a pool of threads, the way the
+    parallel evaluation manager evaluates independent nodes. Each node
+    is only computed by one thread at a time.
+    """
+
+    def __init__(self, threads):
+        self._tasks = queue.Queue()
+        self._threads = []
+        for _ in range(threads):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            node, frame, results, index = task
+            try:
+                results[index] = node.compute(frame)
+            except Exception as e:
+                results[index] = e
+            finally:
+                self._tasks.task_done()
+
+
+    def evaluate(self, nodes, frame):
+        results = [None] * len(nodes)
+        for index, node in enumerate(nodes):
+            self._tasks.put((node, frame, results, index))
+        self._tasks.join()
+        return results
+
+
+    def close(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def runStress(nodeCount=200, frameCount=100, threads=8, seed=0):
+    """
+    runStress (int nodeCount=200, int frameCount=100, int threads=8, int seed=0)
+        -> list failures
+
+        Evaluate nodeCount stand-in nodes over frameCount frames, played
+        forward and then scrubbed in a random order, and return the
+        (node index, frame, result, expected) of every mismatch
+    """
+    shared = {}
+    for s in range(SEEDS * 3):
+        shared[s] = pnoise.NoiseGenerator(s)
+        shared[s].enable_cache(NOISE_CACHE_SIZE)
+
+    rand = random.Random(seed)
+    nodes = [StandInShakeNode(rand, shared) for _ in range(nodeCount)]
+
+    frames = list(range(frameCount))
+    scrubbed = frames[:]
+    rand.shuffle(scrubbed)
+
+    failures = []
+    scheduler = StandInScheduler(threads)
+    try:
+        for frame in frames + scrubbed:
+            for node in nodes:
+                node.setOctaves(node.octavesAt(frame))
+            results = scheduler.evaluate(nodes, frame)
+            for index, (node, result) in enumerate(zip(nodes, results)):
+                expected = node.reference(frame)
+                if result != expected:
+                    failures.append((index, frame, result, expected))
+    finally:
+        scheduler.close()
+
+    return failures
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="pnoise.py thread safety stress test")
+    parser.add_argument("--nodes", type=int, default=200,
+        help="number of stand-in shake nodes (default: %(default)s)")
+    parser.add_argument("--frames", type=int, default=100,
+        help="number of frames to evaluate (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=8,
+        help="number of scheduler threads (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0,
+        help="random seed for the node settings (default: %(default)s)")
+
+    opts = parser.parse_args(argv)
+
+    # switch threads as often as possible, to
+    # interleave them in the middle of pnoise calls
+    if hasattr(sys, "setswitchinterval"):
+        sys.setswitchinterval(1e-6)
+    else:
+        sys.setcheckinterval(1)
+
+    pnoise.GENERATOR_CACHE_SIZE = GENERATOR_CACHE_SIZE
+
+    failures = runStress(opts.nodes, opts.frames, opts.threads, opts.seed)
+
+    evaluations = opts.nodes * opts.frames * 2
+    if not failures:
+        sys.stdout.write("%d evaluations on %d threads, all deterministic\n" %
+                         (evaluations, opts.threads))
+        return 0
+
+    sys.stdout.write("%d of %d evaluations did not match...\n" % (len(failures), evaluations))
+    for index, frame, result, expected in failures[:20]:
+        sys.stdout.write("node %d, frame %d:\t%r (expected %r)\n" % (index, frame, result, expected))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())